@@ -3,6 +3,7 @@ from functools import partial
 import os
 import pickle
 import sys
+from threading import Thread
 import traceback
 
 from pubsub import pub
@@ -13,25 +14,28 @@ from wx.lib.dialogs import MultiMessageDialog
 
 from pyxenoverse.bcs import BCS
 from pyxenoverse.bcs.part_set import PartSet, BCS_PART_LIST
-from pyxenoverse.bcs.part import Part
 from pyxenoverse.bcs.color_selector import ColorSelector
 from pyxenoverse.bcs.physics import Physics
-from pyxenoverse.bcs.body import Body
-from pyxenoverse.bcs.part_color import PartColor
 from pyxenoverse.bcs.color import Color
 from pyxenoverse.bcs.bone_scale import BoneScale
-from pyxenoverse.bcs.skeleton import Skeleton
 from pyxenoverse.bcs.bone import Bone
 from pyxenoverse.gui import create_backup
-from yabcs.utils import color_db
+from yabcs import clipboard
+from yabcs.atomic import atomic_save
+from yabcs.color_refs import ColorSelectorRefs
+from yabcs.document import BcsDocument
+from yabcs.utils import color_db, PLACEHOLDER
 from yabcs.panels.main import MainPanel
+from yabcs.reindex import DirtyRange, get_children
+from yabcs.swatches import SwatchCache, get_swatch_color
 from yabcs.panels.side import SidePanel
 from yabcs.dlg.find import FindDialog
 from yabcs.dlg.replace import ReplaceDialog
-from pyxenoverse.gui import get_next_item
+from yabcs.dlg.diagnostics import DiagnosticsDialog
 from pyxenoverse.gui.file_drop_target import FileDropTarget
 
 VERSION = '0.1.7'
+LOAD_CHUNK_SIZE = 200
 
 
 class MainWindow(wx.Frame):
@@ -39,6 +43,13 @@ class MainWindow(wx.Frame):
         sys.excepthook = self.exception_hook
         self.dirname = ''
         self.bcs = None
+        self.document = None
+        self.load_generation = 0
+        self.loading = False
+        self.loader = None
+        self.saving = False
+        self.reindex_pending = False
+        self.dirty = {name: DirtyRange() for name in ('part_sets', 'part_colors', 'bodies', 'skeletons')}
         self.locale = wx.Locale(wx.LANGUAGE_ENGLISH)
 
         # A "-1" in the size parameter instructs wxWidgets to use the default size.
@@ -58,13 +69,21 @@ class MainWindow(wx.Frame):
         file_menu.Append(wx.ID_EXIT)
 
         edit_menu = wx.Menu()
+        edit_menu.Append(wx.ID_UNDO)
+        edit_menu.Append(wx.ID_REDO)
+        edit_menu.AppendSeparator()
         edit_menu.Append(wx.ID_FIND)
         edit_menu.Append(wx.ID_REPLACE)
 
+        help_menu = wx.Menu()
+        self.diagnostics_id = wx.NewIdRef()
+        help_menu.Append(self.diagnostics_id, "&Diagnostics", "Show how long each message takes")
+
         # Creating the menubar.
         menu_bar = wx.MenuBar()
         menu_bar.Append(file_menu, "&File")  # Adding the "filemenu" to the MenuBar
         menu_bar.Append(edit_menu, "&Edit")
+        menu_bar.Append(help_menu, "&Help")
         self.SetMenuBar(menu_bar)  # Adding the MenuBar to the Frame content.
 
         # Publisher
@@ -73,6 +92,7 @@ class MainWindow(wx.Frame):
         pub.subscribe(self.save_bcs, 'save_bcs')
         pub.subscribe(self.load_part_sets, 'load_part_sets')
         pub.subscribe(self.load_parts, 'load_parts')
+        pub.subscribe(self.populate_part_set, 'populate_part_set')
         pub.subscribe(self.load_color_selectors, 'load_color_selectors')
         pub.subscribe(self.load_physics, 'load_physics')
         pub.subscribe(self.load_part_colors, 'load_part_colors')
@@ -92,15 +112,25 @@ class MainWindow(wx.Frame):
         # Events.
         self.Bind(wx.EVT_MENU, self.open_bcs, id=wx.ID_OPEN)
         self.Bind(wx.EVT_MENU, self.save_bcs, id=wx.ID_SAVE)
+        self.Bind(wx.EVT_MENU, self.on_undo, id=wx.ID_UNDO)
+        self.Bind(wx.EVT_MENU, self.on_redo, id=wx.ID_REDO)
         self.Bind(wx.EVT_MENU, self.on_find, id=wx.ID_FIND)
         self.Bind(wx.EVT_MENU, self.on_replace, id=wx.ID_REPLACE)
+        # Find and Replace need every part set in the tree
+        self.Bind(wx.EVT_UPDATE_UI, self.on_update_find, id=wx.ID_FIND)
+        self.Bind(wx.EVT_UPDATE_UI, self.on_update_find, id=wx.ID_REPLACE)
         self.Bind(wx.EVT_MENU, self.on_about, id=wx.ID_ABOUT)
+        self.Bind(wx.EVT_MENU, self.on_diagnostics, id=self.diagnostics_id)
         self.Bind(wx.EVT_MENU, self.on_exit, id=wx.ID_EXIT)
+        self.Bind(wx.EVT_MENU, self.on_cancel_load, id=wx.ID_CANCEL)
         accelerator_table = wx.AcceleratorTable([
             (wx.ACCEL_CTRL, ord('o'), wx.ID_OPEN),
             (wx.ACCEL_CTRL, ord('s'), wx.ID_SAVE),
+            (wx.ACCEL_CTRL, ord('z'), wx.ID_UNDO),
+            (wx.ACCEL_CTRL, ord('y'), wx.ID_REDO),
             (wx.ACCEL_CTRL, ord('f'), wx.ID_FIND),
             (wx.ACCEL_CTRL, ord('h'), wx.ID_REPLACE),
+            (wx.ACCEL_NORMAL, wx.WXK_ESCAPE, wx.ID_CANCEL),
         ])
         self.SetAcceleratorTable(accelerator_table)
         self.SetDropTarget(FileDropTarget(self, "load_bcs"))
@@ -169,14 +199,25 @@ class MainWindow(wx.Frame):
         self.part_color_list = self.main_panel.pages["Part Colors"].entry_list
         self.body_list = self.main_panel.pages["Bodies"].entry_list
         self.skeleton_list = self.main_panel.pages["Skeletons"].entry_list
+        self.entry_lists = {
+            'part_sets': self.part_set_list,
+            'part_colors': self.part_color_list,
+            'bodies': self.body_list,
+            'skeletons': self.skeleton_list,
+        }
 
         color_db.image_list = wx.ImageList(16, 16)
+        color_db.swatches = SwatchCache(color_db.image_list)
         self.part_set_list.SetImageList(color_db.image_list)
         self.part_color_list.SetImageList(color_db.image_list)
+        self.part_set_list.Bind(wx.EVT_TREE_ITEM_EXPANDING, self.on_part_set_expanding)
+        for name, entry_list in self.entry_lists.items():
+            entry_list.Bind(wx.EVT_TREE_DELETE_ITEM, partial(self.on_tree_item_deleted, self.dirty[name]))
 
-        # Dialogs
-        self.find = FindDialog(self, self.main_panel)
-        self.replace = ReplaceDialog(self, self.main_panel)
+        # Dialogs are created the first time they are opened
+        self.find = None
+        self.replace = None
+        self.diagnostics = None
 
         sizer.Layout()
         self.Show()
@@ -212,17 +253,55 @@ class MainWindow(wx.Frame):
     def load_bcs(self, dirname, filename):
         self.dirname = dirname
         path = os.path.join(self.dirname, filename)
-        self.statusbar.SetStatusText("Loading...")
-        new_bcs = BCS()
-        if not new_bcs.load(path):
+        self.statusbar.SetStatusText("Loading... (Esc to cancel)")
+
+        # Anything still running from an earlier load is ignored from now on
+        self.load_generation += 1
+        self.loading = True
+        Thread(target=self.parse_bcs, args=(self.load_generation, path), daemon=True).start()
+
+    def parse_bcs(self, generation, path):
+        try:
+            new_bcs = BCS()
+            if not new_bcs.load(path):
+                wx.CallAfter(self.on_bcs_parsed, generation, path, None, None)
+                return
+            refs = ColorSelectorRefs()
+            refs.build(new_bcs)
+        except Exception:
+            wx.CallAfter(self.on_load_failed, generation, *sys.exc_info())
+            return
+        wx.CallAfter(self.on_bcs_parsed, generation, path, new_bcs, refs)
+
+    def on_load_failed(self, generation, etype, value, trace):
+        if generation != self.load_generation:
+            return
+        self.loading = False
+        self.statusbar.SetStatusText("")
+        self.exception_hook(etype, value, trace)
+
+    def on_bcs_parsed(self, generation, path, new_bcs, refs):
+        if generation != self.load_generation:
+            return
+        filename = os.path.basename(path)
+        if new_bcs is None:
+            self.loading = False
+            self.statusbar.SetStatusText("")
             dlg = wx.MessageDialog(self, f"{filename} is not a valid BCS", "Warning")
             dlg.ShowModal()
             dlg.Destroy()
             return
         self.bcs = color_db.bcs = new_bcs
+        color_db.refs = refs
+        color_db.find_index.reset(new_bcs)
+        color_db.journal.reset(new_bcs)
+        self.document = color_db.document = BcsDocument(new_bcs, refs, color_db.find_index, color_db.journal)
+        self.document.listeners.append(self.on_document_changed)
+        for dirty in self.dirty.values():
+            dirty.clear()
         color_db.name = filename[:3]
-        self.add_button.Enable()
-        self.enable_add_copy()
+        self.add_button.Disable()
+        self.add_copy_button.Disable()
         self.save_button.Enable()
         self.gender.Enable()
         self.race.Enable()
@@ -230,14 +309,76 @@ class MainWindow(wx.Frame):
 
         self.gender.SetSelection(self.bcs.header.gender)
         self.race.SetSelection(self.bcs.header.race)
-        self.load_part_colors()  # Need to load this first
-        self.load_part_sets()
-        self.load_bodies()
-        self.load_skeletons()
-
         self.name.SetLabel(filename)
         self.main_panel.Layout()
+
+        # Trees are filled in chunks so the first entries can be browsed while the rest load
+        for entry_list in self.entry_lists.values():
+            entry_list.DeleteAllItems()
+        self.loader = self.iter_trees()
+        self.load_next_chunk(generation, path)
+
+    def iter_trees(self):
+        trees = [
+            ("Part Colors", self.iter_part_colors()),  # Need to load this first
+            ("Part Sets", self.iter_part_sets()),
+            ("Bodies", self.iter_bodies()),
+            ("Skeletons", self.iter_skeletons()),
+        ]
+        for name, entries in trees:
+            for loaded, count in entries:
+                yield f"Loading {name} ({loaded}/{count})... (Esc to cancel)"
+
+    def load_next_chunk(self, generation, path):
+        if generation != self.load_generation:
+            return
+        try:
+            self.statusbar.SetStatusText(next(self.loader))
+        except StopIteration:
+            self.finish_loading(path)
+            return
+        wx.CallAfter(self.load_next_chunk, generation, path)
+
+    def finish_loading(self, path):
+        self.loader = None
+        self.loading = False
+        self.add_button.Enable()
+        self.enable_add_copy()
         self.statusbar.SetStatusText(f"Loaded {path}")
+        self.show_invalid_colors(self.get_invalid_colors())
+
+    def on_cancel_load(self, _):
+        if not self.loading:
+            return
+        self.load_generation += 1
+        self.loading = False
+
+        # A half filled tree is of no use, so drop the file entirely
+        if self.loader is not None:
+            self.unload_bcs()
+        self.statusbar.SetStatusText("Loading cancelled")
+
+    def unload_bcs(self):
+        self.loader = None
+        self.bcs = color_db.bcs = None
+        self.document = color_db.document = None
+        color_db.refs.clear()
+        color_db.find_index.clear()
+        color_db.journal.clear()
+        color_db.clear()
+        color_db.swatches.clear()
+        for dirty in self.dirty.values():
+            dirty.clear()
+        for entry_list in self.entry_lists.values():
+            entry_list.DeleteAllItems()
+        self.add_button.Disable()
+        self.add_copy_button.Disable()
+        self.save_button.Disable()
+        self.gender.Disable()
+        self.race.Disable()
+        self.name.SetLabel('(No file loaded)')
+        self.main_panel.Layout()
+        pub.sendMessage('hide_panels')
 
     def show_invalid_colors(self, invalid_colors):
         if not invalid_colors:
@@ -248,16 +389,56 @@ class MainWindow(wx.Frame):
                                 'Warning', msg, wx.OK) as dlg:
             dlg.ShowModal()
 
-    def load_part_sets(self):
-        self.part_set_list.DeleteAllItems()
-        self.part_set_list.Refresh()
-        self.part_set_list.AddRoot("Parts")
+    def get_invalid_colors(self):
         invalid_colors = set()
-        for i, part_set in enumerate(self.bcs.part_sets):
-            part_set_entry = self.part_set_list.AppendItem(
-                self.part_set_list.GetRootItem(), f"{i}: Part Set", data=part_set)
-            invalid_colors.update(self.load_parts(part_set_entry, part_set))
-        self.show_invalid_colors(invalid_colors)
+        for part_set in self.bcs.part_sets:
+            if not part_set:
+                continue
+            for part in part_set.parts.values():
+                for color_selector in part.color_selectors:
+                    try:
+                        color_db[color_selector.part_colors][color_selector.color]
+                    except IndexError:
+                        invalid_colors.add(color_selector)
+        return invalid_colors
+
+    def iter_entries(self, entry_list, root_name, entries, append_entry):
+        entry_list.DeleteAllItems()
+        entry_list.Refresh()
+        root = entry_list.AddRoot(root_name)
+        while True:
+            # Continue from the tree's size, as entries may be added or deleted while loading
+            i = entry_list.GetChildrenCount(root, False)
+            if i >= len(entries):
+                return
+            append_entry(root, i, entries[i])
+            if (i + 1) % LOAD_CHUNK_SIZE == 0:
+                yield i + 1, len(entries)
+
+    def load_part_sets(self):
+        for _ in self.iter_part_sets():
+            pass
+        self.show_invalid_colors(self.get_invalid_colors())
+
+    def iter_part_sets(self):
+        return self.iter_entries(self.part_set_list, "Parts", self.bcs.part_sets, self.append_part_set)
+
+    def append_part_set(self, root, i, part_set):
+        part_set_entry = self.part_set_list.AppendItem(root, f"{i}: Part Set", data=part_set)
+        # Parts are only loaded once the part set is expanded
+        if part_set and part_set.parts:
+            self.part_set_list.AppendItem(part_set_entry, "", data=PLACEHOLDER)
+
+    def on_part_set_expanding(self, e):
+        self.populate_part_set(e.GetItem())
+        e.Skip()
+
+    def populate_part_set(self, item):
+        child, _ = self.part_set_list.GetFirstChild(item)
+        if not child.IsOk() or self.part_set_list.GetItemData(child) is not PLACEHOLDER:
+            return
+        self.part_set_list.Delete(child)
+        self.load_parts(item, self.part_set_list.GetItemData(item))
 
     def load_parts(self, root, part_set, single=False):
         invalid_colors = set()
@@ -301,40 +482,40 @@ class MainWindow(wx.Frame):
             self.part_set_list.AppendItem(physics_entry, f"{i}", data=physics)
 
     def load_part_colors(self):
-        self.part_color_list.DeleteAllItems()
-        self.part_color_list.Refresh()
-        self.part_color_list.AddRoot("Part Colors")
+        for _ in self.iter_part_colors():
+            pass
+
+    def iter_part_colors(self):
         color_db.clear()
-        color_db.image_list.RemoveAll()
-        for i, part_color in enumerate(self.bcs.part_colors):
-            color_set = []
-            color_set_entry = self.part_color_list.AppendItem(
-                self.part_color_list.GetRootItem(), f"{i}: {part_color.name}", data=part_color)
-            self.load_colors(color_set_entry, part_color, color_set)
-            color_db.append(color_set)
+        color_db.swatches.clear()
+        color_db.version += 1
+        return self.iter_entries(self.part_color_list, "Part Colors", self.bcs.part_colors, self.append_part_color)
+
+    def append_part_color(self, root, i, part_color):
+        color_set = []
+        color_set_entry = self.part_color_list.AppendItem(root, f"{i}: {part_color.name}", data=part_color)
+        self.load_colors(color_set_entry, part_color, color_set)
+        color_db.append(color_set)
 
     def load_colors(self, root, part_color, color_set):
         if not part_color:
             return
         for i, color in enumerate(part_color.colors):
-            # Hack, as eye_ uses Color4
-            if part_color.name == "eye_":
-                bitmap = wx.Bitmap.FromRGBA(16, 16, *color.color4[:3], 255)
-            else:
-                bitmap = wx.Bitmap.FromRGBA(16, 16, *color.color1[:3], 255)
-            image = color_db.image_list.Add(bitmap)
+            image = color_db.swatches.acquire(get_swatch_color(part_color, color))
             color_set.append(image)
             color_item = self.part_color_list.AppendItem(root, f"{i}", data=color)
             self.part_color_list.SetItemImage(color_item, image)
 
     def load_bodies(self):
-        self.body_list.DeleteAllItems()
-        self.body_list.Refresh()
-        self.body_list.AddRoot("Bodies")
-        for i, body in enumerate(self.bcs.bodies):
-            body_entry = self.body_list.AppendItem(
-                self.body_list.GetRootItem(), f"{i}: Body", data=body)
-            self.load_bone_scales(body_entry, body)
+        for _ in self.iter_bodies():
+            pass
+
+    def iter_bodies(self):
+        return self.iter_entries(self.body_list, "Bodies", self.bcs.bodies, self.append_body)
+
+    def append_body(self, root, i, body):
+        body_entry = self.body_list.AppendItem(root, f"{i}: Body", data=body)
+        self.load_bone_scales(body_entry, body)
 
     def load_bone_scales(self, root, body):
         if not body:
@@ -343,13 +524,15 @@ class MainWindow(wx.Frame):
             self.body_list.AppendItem(root, f"{i}: {bone_scale.name}", data=bone_scale)
 
     def load_skeletons(self):
-        self.skeleton_list.DeleteAllItems()
-        self.skeleton_list.Refresh()
-        self.skeleton_list.AddRoot("Skeleton")
-        for i, skeleton in enumerate(self.bcs.skeletons):
-            skeleton_entry = self.skeleton_list.AppendItem(
-                self.skeleton_list.GetRootItem(), f"{i}: Skeleton", data=skeleton)
-            self.load_bones(skeleton_entry, skeleton)
+        for _ in self.iter_skeletons():
+            pass
+
+    def iter_skeletons(self):
+        return self.iter_entries(self.skeleton_list, "Skeleton", self.bcs.skeletons, self.append_skeleton)
+
+    def append_skeleton(self, root, i, skeleton):
+        skeleton_entry = self.skeleton_list.AppendItem(root, f"{i}: Skeleton", data=skeleton)
+        self.load_bones(skeleton_entry, skeleton)
 
     def load_bones(self, root, skeleton):
         if not skeleton:
@@ -364,125 +547,353 @@ class MainWindow(wx.Frame):
             dlg.Destroy()  # finally destroy it when finished.
             return
 
+        if self.saving:
+            self.statusbar.SetStatusText("Still saving, please wait")
+            return
+
         dlg = wx.FileDialog(self, "Save as...", self.dirname, "", "*.bcs", wx.FD_SAVE)
         if dlg.ShowModal() == wx.ID_OK:
             filename = dlg.GetFilename()
             self.dirname = dlg.GetDirectory()
             self.statusbar.SetStatusText("Saving...")
-            create_backup(self.dirname, filename)
-            path = os.path.join(self.dirname, filename)
-            self.bcs.header.gender = self.gender.GetSelection()
-            self.bcs.header.race = self.race.GetSelection()
-            self.bcs.save(path)
-            self.statusbar.SetStatusText(f"Saved {path}")
-            saved = wx.MessageDialog(self, f"Saved to {path} successfully", "BCS Saved")
-            saved.ShowModal()
-            saved.Destroy()
+            snapshot = self.snapshot_bcs()
+            self.saving = True
+            self.save_button.Disable()
+            Thread(target=self.write_bcs, args=(snapshot, self.dirname, filename), daemon=True).start()
         dlg.Destroy()
 
-    def reindex_part_sets(self, selected=None):
-        if not self.bcs:
+    def snapshot_bcs(self):
+        self.bcs.header.gender = self.gender.GetSelection()
+        self.bcs.header.race = self.race.GetSelection()
+
+        # Later edits must not leak into the file while it is being written
+        return pickle.loads(pickle.dumps(self.bcs, pickle.HIGHEST_PROTOCOL))
+
+    def write_bcs(self, bcs, dirname, filename):
+        path = os.path.join(dirname, filename)
+        try:
+            create_backup(dirname, filename)
+            atomic_save(bcs, path)
+        except Exception as e:
+            wx.CallAfter(self.on_bcs_saved, path, e)
+            return
+        wx.CallAfter(self.on_bcs_saved, path, None)
+
+    def on_bcs_saved(self, path, error):
+        self.saving = False
+        self.save_button.Enable(self.bcs is not None)
+        if error is not None:
+            self.statusbar.SetStatusText(f"Failed to save {path}")
+            with wx.MessageDialog(self, f"Could not save to {path}:\n{error}", "Warning", wx.OK) as dlg:
+                dlg.ShowModal()
             return
-        if not self.bcs.part_sets:
+        self.statusbar.SetStatusText(f"Saved {path} successfully")
+
+    def on_tree_item_deleted(self, dirty, e):
+        # Items queued for relabeling must not outlive the tree item
+        dirty.discard(e.GetItem())
+        e.Skip()
+
+    def schedule_reindex(self, name, start, item, full):
+        # Requests are coalesced and run once the current event has been handled,
+        # a request without arguments relabels the list right away
+        if start is None and item is None and not full:
+            return False
+        self.dirty[name].mark(start, item, full)
+        if not self.reindex_pending:
+            self.reindex_pending = True
+            wx.CallAfter(self.flush_reindex)
+        return True
+
+    def flush_reindex(self):
+        self.reindex_pending = False
+        # All the coalesced relabeling is drawn once
+        for entry_list in self.entry_lists.values():
+            entry_list.Freeze()
+        try:
+            # Part colors go first, as relabeling them marks the part sets
+            for name in ('part_colors', 'part_sets', 'bodies', 'skeletons'):
+                if self.dirty[name]:
+                    getattr(self, f'reindex_{name}')()
+        finally:
+            for entry_list in self.entry_lists.values():
+                entry_list.Thaw()
+
+    def reindex_part_sets(self, start=None, item=None, full=False):
+        if self.schedule_reindex('part_sets', start, item, full):
             return
-        item = root = self.part_set_list.GetRootItem()
-        part_set_index = 0
-        color_selector_index = 0
-        physics_index = 0
-        while item:
-            data = self.part_set_list.GetItemData(item)
-            num_children = self.part_set_list.GetChildrenCount(item)
+        dirty = self.dirty['part_sets']
+        if not self.bcs or not dirty:
+            return
+        root = self.part_set_list.GetRootItem()
+        if dirty.full:
+            self.relabel_part_set_children(root)
+        else:
+            if dirty.start is not None:
+                children = get_children(self.part_set_list, root)
+                for i, child in enumerate(children[dirty.start:], dirty.start):
+                    self.part_set_list.SetItemText(child, f"{i}: Part Set")
+            for item in list(dirty.items):
+                # Relabel all siblings of a changed color selector or physics
+                if isinstance(self.part_set_list.GetItemData(item), (ColorSelector, Physics)):
+                    item = self.part_set_list.GetItemParent(item)
+                if isinstance(self.part_set_list.GetItemData(item), list) and \
+                        not self.part_set_list.ItemHasChildren(item):
+                    self.part_set_list.Delete(item)
+                else:
+                    self.relabel_part_set_children(item)
+        dirty.clear()
+
+    def relabel_part_set_children(self, item):
+        for i, child in enumerate(get_children(self.part_set_list, item)):
+            data = self.part_set_list.GetItemData(child)
             if isinstance(data, PartSet):
-                self.part_set_list.SetItemText(item, f"{part_set_index}: Part Set")
-                part_set_index += 1
-            elif isinstance(data, Part):
-                color_selector_index = 0
-                physics_index = 0
+                self.part_set_list.SetItemText(child, f"{i}: Part Set")
             elif isinstance(data, ColorSelector):
-                name = self.bcs.part_colors[data.part_colors].name
-                try:
-                    image = color_db[data.part_colors][data.color]
-                    self.part_set_list.SetItemText(item, f"{color_selector_index}: {name}, {data.color}")
-                    self.part_set_list.SetItemImage(item, image)
-                except IndexError:
-                    self.part_set_list.SetItemText(item, f"{color_selector_index}: NULL, -1")
-                    self.part_set_list.SetItemImage(item, -1)
-                color_selector_index += 1
+                self.relabel_color_selector(child, i, data)
+                continue
             elif isinstance(data, Physics):
-                self.part_set_list.SetItemText(item, f"{physics_index}")
-                physics_index += 1
-            elif item != root and num_children == 0:
-                self.part_set_list.Delete(item)
-
-            item = get_next_item(self.part_set_list, item)
-
-    def reindex_part_colors(self, selected=None):
-        if not self.bcs:
+                self.part_set_list.SetItemText(child, f"{i}")
+                continue
+            elif isinstance(data, list) and not self.part_set_list.ItemHasChildren(child):
+                self.part_set_list.Delete(child)
+                continue
+            if data is not PLACEHOLDER:
+                self.relabel_part_set_children(child)
+
+    def relabel_color_selector(self, item, index, data):
+        try:
+            name = self.bcs.part_colors[data.part_colors].name
+            image = color_db[data.part_colors][data.color]
+            self.part_set_list.SetItemText(item, f"{index}: {name}, {data.color}")
+            self.part_set_list.SetItemImage(item, image)
+        except IndexError:
+            self.part_set_list.SetItemText(item, f"{index}: NULL, -1")
+            self.part_set_list.SetItemImage(item, -1)
+
+    def reindex_part_colors(self, start=None, item=None, full=False):
+        if self.schedule_reindex('part_colors', start, item, full):
             return
-        if not self.bcs.part_colors:
+        dirty = self.dirty['part_colors']
+        if not self.bcs or not dirty:
             return
-        item = self.part_color_list.GetRootItem()
-        part_color_name = ''
-        part_color_index = 0
-        color_index = 0
-        while item:
-            data = self.part_color_list.GetItemData(item)
-            if isinstance(data, PartColor):
-                self.part_color_list.SetItemText(item, f"{part_color_index}: {data.name}")
-                part_color_name = data.name
-                part_color_index += 1
-                color_index = 0
-            elif isinstance(data, Color):
-                if part_color_index - 1 > len(color_db):
-                    data.part_color_index = 0
-                    data.color = 0
-                image_index = color_db[part_color_index-1][color_index]
-                if part_color_name == 'eye_':
-                    bitmap = wx.Bitmap.FromRGBA(16, 16, *data.color4[:3], 255)
-                else:
-                    bitmap = wx.Bitmap.FromRGBA(16, 16, *data.color1[:3], 255)
-                color_db.image_list.Replace(image_index, bitmap)
-                self.part_color_list.SetItemText(item, f"{color_index}")
-                color_index += 1
-            item = get_next_item(self.part_color_list, item)
-
-    def reindex_bodies(self, selected=None):
-        if not self.bcs:
+        root = self.part_color_list.GetRootItem()
+        if dirty.full:
+            # Color selectors show the part color names and swatches
+            self.reindex_part_sets(full=True)
+            dirty.start = 0
+            dirty.items = dict.fromkeys(get_children(self.part_color_list, root))
+        # Part colors go before the indexes are relabeled, so a changed name still shows in the old label
+        for item in dirty.items:
+            if isinstance(self.part_color_list.GetItemData(item), Color):
+                item = self.part_color_list.GetItemParent(item)
+            part_color = self.part_color_list.GetItemData(item)
+            part_color_index = self.part_color_list.get_path(item)[1]
+            label = f"{part_color_index}: {part_color.name}"
+            if self.part_color_list.GetItemText(item) != label:
+                self.part_color_list.SetItemText(item, label)
+                self.relabel_color_selectors(color_db.refs.find(part_color_index))
+            color_set = color_db[part_color_index]
+            for color_index, child in enumerate(get_children(self.part_color_list, item)):
+                data = self.part_color_list.GetItemData(child)
+                # Only colors whose swatch changed get redrawn
+                image = color_db.swatches.update(color_set[color_index], get_swatch_color(part_color, data))
+                if image != color_set[color_index]:
+                    color_set[color_index] = image
+                    self.part_color_list.SetItemImage(child, image)
+                    self.relabel_color_selectors(color_db.refs.find(part_color_index, color_index))
+                self.part_color_list.SetItemText(child, f"{color_index}")
+        if dirty.start is not None:
+            children = get_children(self.part_color_list, root)
+            for i, child in enumerate(children[dirty.start:], dirty.start):
+                self.part_color_list.SetItemText(child, f"{i}: {self.part_color_list.GetItemData(child).name}")
+        dirty.clear()
+        color_db.version += 1
+
+    def relabel_color_selectors(self, refs):
+        # Only the color selector lists in the tree are marked, part sets that were never expanded
+        # get their labels when they are populated
+        for _, _, color_selector in refs:
+            path = color_db.journal.get_path(color_selector)
+            item = self.part_set_list.get_item(path[:-1]) if path else None
+            if item is not None:
+                self.reindex_part_sets(item=item)
+
+    def reindex_bodies(self, start=None, item=None, full=False):
+        if not self.schedule_reindex('bodies', start, item, full):
+            self.reindex_named_list(self.body_list, self.dirty['bodies'], "Body")
+
+    def reindex_skeletons(self, start=None, item=None, full=False):
+        if not self.schedule_reindex('skeletons', start, item, full):
+            self.reindex_named_list(self.skeleton_list, self.dirty['skeletons'], "Skeleton")
+
+    def reindex_named_list(self, entry_list, dirty, label):
+        if not self.bcs or not dirty:
             return
-        if not self.bcs.bodies:
+        root = entry_list.GetRootItem()
+        if dirty.full:
+            dirty.start = 0
+            dirty.items = dict.fromkeys(get_children(entry_list, root))
+        if dirty.start is not None:
+            children = get_children(entry_list, root)
+            for i, child in enumerate(children[dirty.start:], dirty.start):
+                entry_list.SetItemText(child, f"{i}: {label}")
+        for item in dirty.items:
+            if isinstance(entry_list.GetItemData(item), (BoneScale, Bone)):
+                item = entry_list.GetItemParent(item)
+            for i, child in enumerate(get_children(entry_list, item)):
+                entry_list.SetItemText(child, f"{i}: {entry_list.GetItemData(child).name}")
+        dirty.clear()
+
+    def on_undo(self, _):
+        # Text controls keep their own undo while they have focus
+        focus = self.FindFocus()
+        if isinstance(focus, wx.TextEntry) and focus.CanUndo():
+            focus.Undo()
             return
-        body_index = 0
-        bone_scale_index = 0
-        item = self.body_list.GetRootItem()
-        while item:
-            data = self.body_list.GetItemData(item)
-            if isinstance(data, Body):
-                self.body_list.SetItemText(item, f"{body_index}: Body")
-                body_index += 1
-                bone_scale_index = 0
-            elif isinstance(data, BoneScale):
-                self.body_list.SetItemText(item, f"{bone_scale_index}: {data.name}")
-                bone_scale_index += 1
-            item = get_next_item(self.body_list, item)
-
-    def reindex_skeletons(self, selected=None):
-        if not self.bcs:
+        # Anything still being typed is saved first, so it is what gets undone
+        self.side_panel.flush_edits()
+        self.apply_journal(color_db.journal.undo(), True)
+
+    def on_redo(self, _):
+        focus = self.FindFocus()
+        if isinstance(focus, wx.TextEntry) and focus.CanRedo():
+            focus.Redo()
             return
-        if not self.bcs.skeletons:
+        self.side_panel.flush_edits()
+        self.apply_journal(color_db.journal.redo(), False)
+
+    def apply_journal(self, action, undo):
+        if not self.bcs or action is None:
             return
-        item = self.skeleton_list.GetRootItem()
-        skeleton_index = 0
-        bone_index = 0
-        while item:
-            data = self.skeleton_list.GetItemData(item)
-            if isinstance(data, Skeleton):
-                self.skeleton_list.SetItemText(item, f"{skeleton_index}: Skeleton")
-                skeleton_index += 1
-                bone_index = 0
-            elif isinstance(data, Bone):
-                self.skeleton_list.SetItemText(item, f"{bone_index}: {data.name}")
-                bone_index += 1
-            item = get_next_item(self.skeleton_list, item)
+        label, ops = action
+        self.document.apply_ops(ops, undo)
+        self.main_panel.notebook.GetCurrentPage().on_select(None)
+        self.statusbar.SetStatusText(f"{'Undid' if undo else 'Redid'} {label}")
+
+    def on_document_changed(self, events):
+        invalid_colors = set()
+        for entry_list in self.entry_lists.values():
+            entry_list.Freeze()
+        try:
+            i = 0
+            while i < len(events):
+                end = self.get_remove_run(events, i)
+                if end > i + 1:
+                    self.apply_removes(events[i:end])
+                else:
+                    invalid_colors.update(self.apply_event(events[i]))
+                i = end
+        finally:
+            for entry_list in self.entry_lists.values():
+                entry_list.Thaw()
+        self.show_invalid_colors(invalid_colors)
+
+    @staticmethod
+    def get_remove_run(events, start):
+        # Removes from the same list going down in index all refer to the tree as it was before the first one
+        end = start + 1
+        if events[start].kind != 'remove':
+            return end
+        while end < len(events) and events[end].kind == 'remove' and \
+                events[end].path[0] == events[start].path[0] and events[end].path[1] < events[end - 1].path[1]:
+            end += 1
+        return end
+
+    def apply_removes(self, events):
+        name = events[0].path[0]
+        entry_list = self.entry_lists[name]
+        items = [entry_list.get_item(event.path) for event in events]
+        for event, item in zip(events, items):
+            if name == 'part_colors':
+                for image in color_db.pop(event.path[1]):
+                    color_db.swatches.release(image)
+            entry_list.Delete(item)
+        getattr(self, f'reindex_{name}')(start=events[-1].path[1])
+
+    def get_entry_item(self, entry_list, index, record):
+        # Events are applied in order, so the index only misses when rebuilds were merged
+        item = entry_list.get_item((entry_list.list_name, index))
+        if item is not None and entry_list.GetItemData(item) is record:
+            return index, item
+        for i, child in enumerate(get_children(entry_list, entry_list.GetRootItem())):
+            if entry_list.GetItemData(child) is record:
+                return i, child
+        return None, None
+
+    def apply_event(self, event):
+        # Only the top level entry holding the path is updated in the tree
+        name, index = event.path[:2]
+        entry_list = self.entry_lists[name]
+        reindex = getattr(self, f'reindex_{name}')
+        if event.kind == 'insert':
+            item = entry_list.InsertItem(entry_list.GetRootItem(), index, "", data=event.record)
+            if name == 'part_colors':
+                color_db.insert(index, [])
+            self.load_entry_children(name, index, item, event.record, False)
+            reindex(start=index)
+            return []
+
+        if event.kind == 'remove':
+            item = entry_list.get_item(event.path)
+            if name == 'part_colors':
+                for image in color_db.pop(index):
+                    color_db.swatches.release(image)
+            entry_list.Delete(item)
+            reindex(start=index)
+            return []
+
+        index, item = self.get_entry_item(entry_list, index, event.record)
+        if item is None:
+            return []
+        invalid_colors = []
+        if event.kind == 'rebuild':
+            if name == 'part_colors':
+                for image in color_db[index]:
+                    color_db.swatches.release(image)
+                # Colors were added or removed, so the color indexes of its color selectors may have moved
+                self.relabel_color_selectors(color_db.refs.find(index))
+            child, _ = entry_list.GetFirstChild(item)
+            populated = child.IsOk() and entry_list.GetItemData(child) is not PLACEHOLDER
+            expanded = self.get_expanded(entry_list, item)
+            entry_list.DeleteChildren(item)
+            invalid_colors = self.load_entry_children(name, index, item, event.record, populated)
+            self.restore_expanded(entry_list, item, expanded)
+        reindex(item=item)
+        return invalid_colors
+
+    def get_expanded(self, entry_list, item):
+        expanded = set()
+        for child in get_children(entry_list, item):
+            if entry_list.IsExpanded(child):
+                expanded.add(id(entry_list.GetItemData(child)))
+                expanded.update(self.get_expanded(entry_list, child))
+        return expanded
+
+    def restore_expanded(self, entry_list, item, expanded):
+        if not expanded:
+            return
+        for child in get_children(entry_list, item):
+            if id(entry_list.GetItemData(child)) in expanded:
+                entry_list.Expand(child)
+                self.restore_expanded(entry_list, child, expanded)
+
+    def load_entry_children(self, name, index, item, data, populated):
+        if name == 'part_sets':
+            # Part sets that were never expanded stay unloaded
+            if populated:
+                return self.load_parts(item, data)
+            if data and data.parts:
+                self.part_set_list.AppendItem(item, "", data=PLACEHOLDER)
+        elif name == 'part_colors':
+            color_set = []
+            self.load_colors(item, data, color_set)
+            color_db[index] = color_set
+        elif name == 'bodies':
+            self.load_bone_scales(item, data)
+        elif name == 'skeletons':
+            self.load_bones(item, data)
+        return []
 
     def on_add(self, _, paste=False):
         text = self.add_button.GetLabelText().replace(" Copy", "")
@@ -503,26 +914,48 @@ class MainWindow(wx.Frame):
 
     def enable_add_copy(self):
         text = self.add_copy_button.GetLabelText().replace(" Copy", "")[4:]
-        cdo = wx.CustomDataObject("BCSEntry")
+        cdo = wx.CustomDataObject(clipboard.FORMAT)
         success = False
         valid = False
         if wx.TheClipboard.Open():
             success = wx.TheClipboard.GetData(cdo)
             wx.TheClipboard.Close()
-        if success:
-            paste_data = pickle.loads(cdo.GetData())
-            if not isinstance(paste_data[0], list):
-                item_type = type(paste_data[0])
-                valid = not isinstance(item_type, list) and item_type.get_readable_name() == text
+        header = clipboard.read_header(bytes(cdo.GetData())) if success else None
+        if header:
+            item_type, is_list, _ = header
+            valid = not is_list and item_type.get_readable_name() == text
         self.add_copy_button.Enable(valid)
 
+    def get_find_dialog(self):
+        if self.find is None:
+            self.find = FindDialog(self, self.main_panel)
+        return self.find
+
+    def get_replace_dialog(self):
+        if self.replace is None:
+            self.replace = ReplaceDialog(self, self.main_panel)
+        return self.replace
+
+    def on_update_find(self, e):
+        e.Enable(not self.loading)
+
     def on_find(self, _):
-        if not self.replace.IsShown():
-            self.find.Show()
+        if self.loading:
+            return
+        if not self.replace or not self.replace.IsShown():
+            self.get_find_dialog().Show()
 
     def on_replace(self, _):
-        if not self.find.IsShown():
-            self.replace.Show()
+        if self.loading:
+            return
+        if not self.find or not self.find.IsShown():
+            self.get_replace_dialog().Show()
+
+    def on_diagnostics(self, _):
+        if self.diagnostics is None:
+            self.diagnostics = DiagnosticsDialog(self)
+        self.diagnostics.Show()
+        self.diagnostics.Raise()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,232 @@
+import argparse
+from functools import partial
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from pubsub import pub
+import wx
+
+from pyxenoverse.bcs import BCS
+from pyxenoverse.bcs.part import Part
+from pyxenoverse.bcs.part_set import PartSet
+from pyxenoverse.bcs.color_selector import ColorSelector
+
+from benchmarks.synthetic import SIZES, generate_bcs
+from yabcs import clipboard
+from yabcs.color_refs import ColorSelectorRefs
+from yabcs.query import Query
+from yabcs.reindex import get_children
+from yabcs.utils import FIND_ITEM_TYPES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_organizer():
+    spec = importlib.util.spec_from_file_location('organizer', os.path.join(ROOT, 'YaBCS Organizer.py'))
+    organizer = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(organizer)
+    return organizer
+
+
+def measure(func, setup, repeat):
+    times = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        func(*args)
+        # Work deferred to the event loop, like coalesced reindexing, is part of the path
+        wx.GetApp().ProcessPendingEvents()
+        times.append(time.perf_counter() - start)
+    return {
+        'runs': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'max': max(times),
+    }
+
+
+class Runner:
+    def __init__(self, window, path, counts, repeat):
+        self.window = window
+        self.path = path
+        self.counts = counts
+        self.repeat = repeat
+        self.batch = max(1, counts['part_sets'] // 10)
+        self.part_set_page = window.main_panel.pages["Part Sets"]
+        self.part_set_list = window.part_set_list
+
+    def parse(self):
+        new_bcs = BCS()
+        new_bcs.load(self.path)
+        refs = ColorSelectorRefs()
+        refs.build(new_bcs)
+        return new_bcs, refs
+
+    def open(self):
+        # Same as load_bcs, but the trees are filled right away instead of from the event loop
+        window = self.window
+        window.load_generation += 1
+        window.loading = True
+        window.on_bcs_parsed(window.load_generation, self.path, *self.parse())
+        for _ in window.loader:
+            pass
+        window.load_generation += 1
+        window.finish_loading(self.path)
+        return ()
+
+    def open_populated(self):
+        self.open()
+        for item in get_children(self.part_set_list, self.part_set_list.GetRootItem()):
+            self.window.populate_part_set(item)
+        return ()
+
+    def select(self, count):
+        self.part_set_list.UnselectAll()
+        items = get_children(self.part_set_list, self.part_set_list.GetRootItem())[:count]
+        for item in items:
+            self.part_set_list.SelectItem(item)
+        return items
+
+    def set_query(self, dlg, item_type, entry_type, find, replace=None):
+        item_types = [t for t, _ in FIND_ITEM_TYPES]
+        dlg.items.SetSelection(item_types.index(item_type))
+        dlg.on_choice(None)
+        dlg.entry.SetSelection(dict(FIND_ITEM_TYPES)[item_type].index(entry_type))
+        dlg.find_ctrl.SetValue(find)
+        dlg.regex_ctrl.SetValue(False)
+        if replace is not None:
+            dlg.replace_ctrl.SetValue(replace)
+
+    def reindex(self, name):
+        pub.sendMessage(f'reindex_{name}', full=True)
+        self.window.flush_reindex()
+
+    def setup_find(self):
+        self.open()
+        last = self.counts['part_sets'] - 1
+        first = get_children(self.part_set_list, self.part_set_list.GetRootItem())[0]
+        return first, Query(f'SYN_{last:03}_', False)
+
+    def find(self, first, query):
+        self.window.get_find_dialog().find(first, Part, 'emd_name', query)
+
+    def setup_find_all(self):
+        self.open()
+        self.set_query(self.window.get_find_dialog(), ColorSelector, 'color', '0')
+        return ()
+
+    def setup_replace_names(self):
+        self.open_populated()
+        self.set_query(self.window.get_replace_dialog(), Part, 'emb_name', 'SYN', 'BEN')
+        return ()
+
+    def setup_replace_colors(self):
+        self.open_populated()
+        self.set_query(self.window.get_replace_dialog(), ColorSelector, 'color', '0', '1')
+        return ()
+
+    def setup_paste(self):
+        self.open()
+        part_sets = self.window.bcs.part_sets[-self.batch:]
+        self.select(self.batch)
+        self.part_set_page.paste_data = clipboard.decode(clipboard.encode(part_sets))
+        self.part_set_page.paste_data_type = PartSet
+        self.part_set_page.paste_data_actual_type = PartSet
+        return ()
+
+    def setup_delete(self):
+        self.open()
+        self.select(self.batch)
+        return ()
+
+    def save(self):
+        dirname = os.path.dirname(self.path)
+        self.window.write_bcs(self.window.snapshot_bcs(), dirname, 'saved.bcs')
+
+    def run(self):
+        window = self.window
+        paths = [
+            ('parse_bcs', self.parse, None),
+            ('load_part_colors', window.load_part_colors, self.open),
+            ('load_part_sets', window.load_part_sets, self.open),
+            ('populate_part_sets', self.open_populated, None),
+            ('reindex_part_sets', partial(self.reindex, 'part_sets'), self.open_populated),
+            ('reindex_part_colors', partial(self.reindex, 'part_colors'), self.open),
+            ('reindex_bodies', partial(self.reindex, 'bodies'), self.open),
+            ('reindex_skeletons', partial(self.reindex, 'skeletons'), self.open),
+            ('find', self.find, self.setup_find),
+            ('find_all', lambda: window.get_find_dialog().on_find_all(None), self.setup_find_all),
+            ('replace_all_names', lambda: window.get_replace_dialog().on_replace_all(None), self.setup_replace_names),
+            ('replace_all_colors', lambda: window.get_replace_dialog().on_replace_all(None), self.setup_replace_colors),
+            ('paste', lambda: self.part_set_page.on_paste(None, use_existing=True), self.setup_paste),
+            ('delete', lambda: self.part_set_page.on_delete(None), self.setup_delete),
+            ('save_bcs', self.save, self.open),
+        ]
+        results = {}
+        for name, func, setup in paths:
+            results[name] = measure(func, setup, self.repeat)
+            print(f"  {name}: {results[name]['median'] * 1000:.1f} ms", file=sys.stderr)
+        window.unload_bcs()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Time the hot paths of the organizer on synthetic BCS files')
+    parser.add_argument('sizes', nargs='*', default=list(SIZES), choices=list(SIZES), metavar='size',
+                        help=f"Model sizes to run ({', '.join(SIZES)})")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Runs per path')
+    parser.add_argument('-o', '--output', help='Write the JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    organizer = load_organizer()
+    app = wx.App(False)
+    start = time.perf_counter()
+    window = organizer.MainWindow(None, 'Benchmarks', None, None)
+    startup = time.perf_counter() - start
+    window.Hide()
+    # Errors should stop the run instead of opening a dialog
+    sys.excepthook = sys.__excepthook__
+
+    report = {
+        'version': organizer.VERSION,
+        'python': platform.python_version(),
+        'wx': wx.version(),
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': args.repeat,
+        'startup': startup,
+        'sizes': {},
+    }
+    with tempfile.TemporaryDirectory() as dirname:
+        for size in args.sizes:
+            print(f"{size}:", file=sys.stderr)
+            counts = SIZES[size]
+            path = os.path.join(dirname, f'{size}.bcs')
+            generate_bcs(**counts).save(path)
+            runner = Runner(window, path, counts, args.repeat)
+            report['sizes'][size] = {
+                'counts': counts,
+                'file_size': os.path.getsize(path),
+                'paths': runner.run(),
+            }
+    window.Destroy()
+    app.Destroy()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+import random
+
+from pyxenoverse.bcs import BCS
+from pyxenoverse.bcs.part_set import PartSet, BCS_PART_LIST
+from pyxenoverse.bcs.part import Part
+from pyxenoverse.bcs.color_selector import ColorSelector
+from pyxenoverse.bcs.physics import Physics
+from pyxenoverse.bcs.part_color import PartColor
+from pyxenoverse.bcs.color import Color
+from pyxenoverse.bcs.body import Body
+from pyxenoverse.bcs.bone_scale import BoneScale
+from pyxenoverse.bcs.skeleton import Skeleton
+from pyxenoverse.bcs.bone import Bone
+
+SIZES = {
+    'small': dict(part_sets=50, parts=4, color_selectors=2, physics=1, part_colors=20, colors=10,
+                  bodies=5, bone_scales=10, skeletons=1, bones=50),
+    'medium': dict(part_sets=500, parts=6, color_selectors=3, physics=1, part_colors=60, colors=30,
+                   bodies=20, bone_scales=20, skeletons=2, bones=100),
+    'large': dict(part_sets=5000, parts=8, color_selectors=4, physics=2, part_colors=120, colors=60,
+                  bodies=50, bone_scales=30, skeletons=4, bones=200),
+}
+
+PART_COLOR_NAMES = ['skin_', 'hair_', 'eye_', 'CC00_BUST_', 'CC00_PANTS_', 'CC00_RIST_', 'CC00_BOOTS_']
+
+
+def get_random_color(rng):
+    return [rng.randrange(256), rng.randrange(256), rng.randrange(256), 255]
+
+
+def generate_bcs(part_sets=50, parts=4, color_selectors=2, physics=1, part_colors=20, colors=10,
+                 bodies=5, bone_scales=10, skeletons=1, bones=50, name='SYN', seed=0):
+    rng = random.Random(seed)
+    bcs = BCS()
+
+    # Part colors come first so every color selector can point at a valid color
+    bcs.part_colors = []
+    for i in range(part_colors):
+        part_color = PartColor()
+        part_color.name = PART_COLOR_NAMES[i % len(PART_COLOR_NAMES)]
+        part_color.colors = []
+        for _ in range(colors):
+            color = Color()
+            color.color1 = get_random_color(rng)
+            color.color2 = get_random_color(rng)
+            color.color3 = get_random_color(rng)
+            color.color4 = get_random_color(rng)
+            part_color.colors.append(color)
+        bcs.part_colors.append(part_color)
+
+    bcs.part_sets = []
+    for i in range(part_sets):
+        part_set = PartSet()
+        part_set.parts = {}
+        for part_name in sorted(rng.sample(BCS_PART_LIST, min(parts, len(BCS_PART_LIST))), key=BCS_PART_LIST.index):
+            part = Part()
+            part.name = name
+            part.model = i
+            part.emd_name = f'{name}_{i:03}_{part_name}'
+            part.emb_name = f'{name}_{i:03}'
+            part.color_selectors = []
+            for _ in range(color_selectors if part_colors and colors else 0):
+                color_selector = ColorSelector()
+                color_selector.part_colors = rng.randrange(part_colors)
+                color_selector.color = rng.randrange(colors)
+                part.color_selectors.append(color_selector)
+            part.physics = []
+            for j in range(physics):
+                physics_entry = Physics()
+                physics_entry.name = name
+                physics_entry.emd_name = f'{name}_{i:03}_{part_name}_{j}'
+                physics_entry.bone_name = 'b_C_Base'
+                part.physics.append(physics_entry)
+            part_set.parts[part_name] = part
+        bcs.part_sets.append(part_set)
+
+    bcs.bodies = []
+    for _ in range(bodies):
+        body = Body()
+        body.bone_scales = []
+        for j in range(bone_scales):
+            bone_scale = BoneScale()
+            bone_scale.name = f'b_C_Bone{j}'
+            body.bone_scales.append(bone_scale)
+        bcs.bodies.append(body)
+
+    bcs.skeletons = []
+    for _ in range(skeletons):
+        skeleton = Skeleton()
+        skeleton.bones = []
+        for j in range(bones):
+            bone = Bone()
+            bone.name = f'b_C_Bone{j}'
+            skeleton.bones.append(bone)
+        bcs.skeletons.append(skeleton)
+    return bcs
@@ -0,0 +1,15 @@
+import os
+
+
+def atomic_save(bcs, path):
+    # Write next to the target so the final rename never crosses file systems
+    temp_path = f'{path}.tmp'
+    try:
+        bcs.save(temp_path)
+        with open(temp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
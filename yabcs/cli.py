@@ -0,0 +1,259 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import os
+import shutil
+import sys
+
+from pyxenoverse.bcs import BCS
+from pyxenoverse.bcs.color_selector import ColorSelector
+from pyxenoverse.bcs.part_set import BCS_PART_LIST
+
+from yabcs.atomic import atomic_save
+from yabcs.find_index import FindIndex
+from yabcs.query import Query
+from yabcs.replace import is_valid_color, plan_replace
+from yabcs.utils import FIND_ITEM_TYPES
+
+# Same order as the header combo boxes in the organizer
+GENDERS = ["Male", "Female"]
+RACES = ["Human", "Saiyan", "Namekian", "Frieza", "Majin", "Android (?)"]
+
+ITEM_TYPES = {item_type.__name__: (item_type, fields) for item_type, fields in FIND_ITEM_TYPES}
+
+
+def find_files(paths, recursive):
+    # Returns (path, name) pairs, name is the path relative to the directory it was found in
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append((path, os.path.basename(path)))
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            for f in sorted(filenames):
+                if f.lower().endswith('.bcs'):
+                    file_path = os.path.join(dirpath, f)
+                    files.append((file_path, os.path.relpath(file_path, path)))
+            if not recursive:
+                break
+            dirnames.sort()
+    return files
+
+
+def get_color_sets(bcs):
+    # Stands in for the organizer's color_db, only the lengths are used
+    return [part_color.colors if part_color else [] for part_color in bcs.part_colors]
+
+
+def format_position(position):
+    part_set_index, part_index, kind, sub_index = position
+    location = f"Part Set {part_set_index}, {BCS_PART_LIST[part_index].replace('_', ' ').title()}"
+    if kind == 1:
+        location += f", Color Selector {sub_index}"
+    elif kind == 2:
+        location += f", Physics {sub_index}"
+    return location
+
+
+def format_value(value):
+    return value if isinstance(value, str) else f'{value} (0x{value:X})'
+
+
+def get_name(names, index):
+    return names[index] if 0 <= index < len(names) else str(index)
+
+
+def get_query(args):
+    item_type, _ = ITEM_TYPES[args.type]
+    return item_type, Query(args.find, "name" not in args.field, args.regex)
+
+
+def run_validate(bcs, args, output_path):
+    messages = []
+    color_sets = get_color_sets(bcs)
+    index = FindIndex(FIND_ITEM_TYPES)
+    index.reset(bcs)
+    index.refresh()
+    for record, _, _, _ in index.records.values():
+        if isinstance(record, ColorSelector) and not is_valid_color(record.part_colors, record.color, color_sets):
+            messages.append(f"{format_position(index.position(record))}: "
+                            f"invalid Part Color ({record.part_colors}, {record.color})")
+    return sorted(messages), False
+
+
+def run_find(bcs, args, output_path):
+    item_type, query = get_query(args)
+    index = FindIndex(FIND_ITEM_TYPES)
+    index.reset(bcs)
+    positions, records = index.search(item_type, args.field, query)
+    messages = [f"{format_position(position)}: {format_value(record[args.field])}"
+                for position, record in zip(positions, records)]
+    return messages, False
+
+
+def run_replace(bcs, args, output_path):
+    item_type, query = get_query(args)
+    replace = int(args.replace, 0) if query.numeric else args.replace
+    index = FindIndex(FIND_ITEM_TYPES)
+    index.reset(bcs)
+    change_set = plan_replace(item_type, args.field, query, replace, index, get_color_sets(bcs))
+    messages = []
+    for change in change_set.changes:
+        messages.append(f"{format_position(index.get_position(change.record))}: "
+                        f"{format_value(change.old)} -> {format_value(change.new)}")
+        change.record[change.field] = change.new
+    for change in change_set.skipped:
+        messages.append(f"{format_position(index.get_position(change.record))}: skipped, "
+                        f"{format_value(change.new)} is not a valid color")
+    return messages, bool(change_set)
+
+
+def run_header(bcs, args, output_path):
+    messages = []
+    if args.gender is not None:
+        gender = GENDERS.index(args.gender)
+        if bcs.header.gender != gender:
+            messages.append(f"gender: {get_name(GENDERS, bcs.header.gender)} -> {args.gender}")
+            bcs.header.gender = gender
+    if args.race is not None:
+        race = RACES.index(args.race)
+        if bcs.header.race != race:
+            messages.append(f"race: {get_name(RACES, bcs.header.race)} -> {args.race}")
+            bcs.header.race = race
+    return messages, bool(messages)
+
+
+def run_xml(bcs, args, output_path):
+    indexes = args.part_set if args.part_set else range(len(bcs.part_sets))
+    xml = []
+    for i in indexes:
+        if not 0 <= i < len(bcs.part_sets):
+            raise ValueError(f"there is no part set {i}")
+        if bcs.part_sets[i]:
+            xml.append(bcs.part_sets[i].generate_xml(bcs.part_colors))
+    xml_path = f"{os.path.splitext(output_path)[0]}.xml"
+    with open(xml_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(xml))
+    return [f"wrote {len(xml)} part set(s) to {xml_path}"], False
+
+
+COMMANDS = {
+    'validate': run_validate,
+    'find': run_find,
+    'replace': run_replace,
+    'header': run_header,
+    'xml': run_xml,
+}
+
+
+def get_output_path(path, args, name):
+    # Files found in a directory keep their place below it under --output
+    if not args.output:
+        return path
+    output_path = os.path.join(args.output, name)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    return output_path
+
+
+def process_file(file, args):
+    # Runs in a worker process, returns (path, ok, messages)
+    path, name = file
+    try:
+        bcs = BCS()
+        if not bcs.load(path):
+            return path, False, ["not a valid BCS"]
+        output_path = get_output_path(path, args, name)
+        messages, changed = COMMANDS[args.command](bcs, args, output_path)
+        if changed and not args.dry_run:
+            if output_path == path and args.backup:
+                shutil.copy2(path, f'{path}.bak')
+            atomic_save(bcs, output_path)
+    except Exception as e:
+        return path, False, [f"error: {e}"]
+    ok = not (args.command == 'validate' and messages)
+    return path, ok, messages
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='python -m yabcs', description='Process BCS files without the GUI')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Worker processes (default: one per CPU)')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    def add_command(name, help, writes=False):
+        subparser = subparsers.add_parser(name, help=help)
+        subparser.add_argument('paths', nargs='+', help='BCS files or directories holding them')
+        subparser.add_argument('-r', '--recursive', action='store_true', help='Also look in subdirectories')
+        if writes:
+            subparser.add_argument('-o', '--output', help='Write to this directory instead of in place')
+            subparser.add_argument('-n', '--dry-run', action='store_true', help='Only report what would change')
+            subparser.add_argument('--no-backup', dest='backup', action='store_false',
+                                   help='Do not keep a .bak copy of files changed in place')
+        return subparser
+
+    add_command('validate', 'Report color selectors pointing at missing part colors')
+
+    for name, help in (('find', 'List entries matching a value'), ('replace', 'Replace matching values')):
+        subparser = add_command(name, help, writes=name == 'replace')
+        subparser.add_argument('-t', '--type', required=True, choices=list(ITEM_TYPES))
+        subparser.add_argument('-f', '--field', required=True)
+        subparser.add_argument('--find', required=True, help='Text, number, range "a-b" or mask "& m" to match')
+        subparser.add_argument('--regex', action='store_true', help='Treat --find as a regular expression')
+        if name == 'replace':
+            subparser.add_argument('--replace', required=True)
+
+    subparser = add_command('header', 'Set the header gender and race', writes=True)
+    subparser.add_argument('--gender', choices=GENDERS)
+    subparser.add_argument('--race', choices=RACES)
+
+    subparser = add_command('xml', 'Export part set XML for the costume creator')
+    subparser.add_argument('-p', '--part-set', type=int, action='append', help='Only export this part set')
+    subparser.add_argument('-o', '--output', help='Write to this directory instead of next to the file')
+    return parser
+
+
+def main(argv=None):
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.command in ('find', 'replace') and args.field not in ITEM_TYPES[args.type][1]:
+        parser.error(f"--field must be one of {', '.join(ITEM_TYPES[args.type][1])} for {args.type}")
+    if args.command in ('find', 'replace'):
+        try:
+            _, query = get_query(args)
+        except ValueError as e:
+            parser.error(f"invalid --find: {e}")
+        if args.command == 'replace' and query.numeric:
+            try:
+                int(args.replace, 0)
+            except ValueError:
+                parser.error(f"--replace must be a number for {args.field}")
+    if args.command == 'header' and args.gender is None and args.race is None:
+        parser.error("nothing to change, give --gender and/or --race")
+    for name in ('output', 'dry_run', 'backup'):
+        if not hasattr(args, name):
+            setattr(args, name, None)
+
+    files = find_files(args.paths, args.recursive)
+    if not files:
+        print("No BCS files found", file=sys.stderr)
+        return 1
+    if args.output:
+        # Two inputs with the same name would silently overwrite each other's output
+        seen = {}
+        for path, name in files:
+            other = seen.setdefault(os.path.normcase(os.path.normpath(name)), path)
+            if other != path:
+                parser.error(f"{other} and {path} would both be written to {os.path.join(args.output, name)}")
+        os.makedirs(args.output, exist_ok=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        for path, ok, messages in executor.map(process_file, files, repeat(args), chunksize=8):
+            if not ok:
+                failed += 1
+            if messages or not ok:
+                print(path)
+                for message in messages:
+                    print(f"  {message}")
+    print(f"{len(files)} file(s), {failed} with problems", file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,82 @@
+import base64
+import json
+import struct
+import zlib
+
+from pyxenoverse.bcs.part_set import PartSet
+from pyxenoverse.bcs.part import Part
+from pyxenoverse.bcs.color_selector import ColorSelector
+from pyxenoverse.bcs.physics import Physics
+from pyxenoverse.bcs.part_color import PartColor
+from pyxenoverse.bcs.color import Color
+from pyxenoverse.bcs.body import Body
+from pyxenoverse.bcs.bone_scale import BoneScale
+from pyxenoverse.bcs.skeleton import Skeleton
+from pyxenoverse.bcs.bone import Bone
+
+# Older builds unpickle whatever is under "BCSEntry", so this format gets its own name
+FORMAT = "BCSEntry2"
+MAGIC = b'BCSC'
+VERSION = 1
+
+# magic, version, type code, is list, count
+HEADER = struct.Struct('<4sBBBxI')
+
+# Type codes are stored in the clipboard, only ever append to this list
+TYPES = [PartSet, Part, ColorSelector, Physics, PartColor, Color, Body, BoneScale, Skeleton, Bone]
+
+
+def encode(data):
+    is_list = isinstance(data[0], list)
+    item_type = type(data[0][0]) if is_list else type(data[0])
+    header = HEADER.pack(MAGIC, VERSION, TYPES.index(item_type), is_list, len(data))
+    return header + zlib.compress(json.dumps(to_json(data), separators=(',', ':')).encode())
+
+
+def read_header(raw):
+    # Returns the item type, if it is a list of items and the count without decoding anything
+    if len(raw) < HEADER.size:
+        return None
+    magic, version, type_code, is_list, count = HEADER.unpack_from(raw)
+    if magic != MAGIC or version > VERSION or type_code >= len(TYPES):
+        return None
+    return TYPES[type_code], bool(is_list), count
+
+
+def decode(raw):
+    return from_json(json.loads(zlib.decompress(raw[HEADER.size:])))
+
+
+def to_json(value):
+    if type(value) in TYPES:
+        return {'__type__': TYPES.index(type(value)),
+                'fields': {name: to_json(field) for name, field in vars(value).items()}}
+    if isinstance(value, list):
+        return [to_json(v) for v in value]
+    if isinstance(value, tuple):
+        return {'__tuple__': [to_json(v) for v in value]}
+    if isinstance(value, dict):
+        return {'__dict__': [[to_json(k), to_json(v)] for k, v in value.items()]}
+    if isinstance(value, (bytes, bytearray)):
+        return {'__bytes__': base64.b64encode(value).decode()}
+    return value
+
+
+def from_json(value):
+    if isinstance(value, list):
+        return [from_json(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+    if '__type__' in value:
+        # Start from a new entry so fields missing from older versions keep their defaults
+        record = TYPES[value['__type__']]()
+        for name, field in value['fields'].items():
+            record.__dict__[name] = from_json(field)
+        return record
+    if '__tuple__' in value:
+        return tuple(from_json(v) for v in value['__tuple__'])
+    if '__dict__' in value:
+        return {from_json(k): from_json(v) for k, v in value['__dict__']}
+    if '__bytes__' in value:
+        return base64.b64decode(value['__bytes__'])
+    return value
@@ -0,0 +1,153 @@
+from bisect import bisect_left
+
+
+class ColorSelectorRefs:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # part colors -> color -> id(color selector) -> (part set, part, color selector)
+        self.refs = {}
+        # id(color selector) -> (part colors, color) it is filed under
+        self.keys = {}
+        self.part_sets = {}
+        self.parts = {}
+
+    def build(self, bcs):
+        self.clear()
+        for part_set in bcs.part_sets:
+            self.add_part_set(part_set)
+
+    def add_part_set(self, part_set):
+        if not part_set:
+            return
+        for part in part_set.parts.values():
+            self.add_part(part_set, part)
+
+    def remove_part_set(self, part_set):
+        for selector_id in list(self.part_sets.get(id(part_set), [])):
+            self.remove_id(selector_id)
+
+    def add_part(self, part_set, part):
+        for color_selector in part.color_selectors:
+            self.add(part_set, part, color_selector)
+
+    def remove_part(self, part):
+        for selector_id in list(self.parts.get(id(part), [])):
+            self.remove_id(selector_id)
+
+    def add(self, part_set, part, color_selector):
+        selector_id = id(color_selector)
+        if selector_id in self.keys:
+            self.remove_id(selector_id)
+        key = (color_selector.part_colors, color_selector.color)
+        self.keys[selector_id] = key
+        self.get_bucket(*key)[selector_id] = (part_set, part, color_selector)
+        self.part_sets.setdefault(id(part_set), set()).add(selector_id)
+        self.parts.setdefault(id(part), set()).add(selector_id)
+
+    def remove(self, color_selector):
+        self.remove_id(id(color_selector))
+
+    def remove_id(self, selector_id):
+        key = self.keys.pop(selector_id, None)
+        if key is None:
+            return
+        part_set, part, _ = self.pop_bucket_entry(key, selector_id)
+        self.discard(self.part_sets, id(part_set), selector_id)
+        self.discard(self.parts, id(part), selector_id)
+
+    def update(self, color_selector):
+        selector_id = id(color_selector)
+        old_key = self.keys.get(selector_id)
+        new_key = (color_selector.part_colors, color_selector.color)
+        if old_key is None or old_key == new_key:
+            return
+        self.get_bucket(*new_key)[selector_id] = self.pop_bucket_entry(old_key, selector_id)
+        self.keys[selector_id] = new_key
+
+    def find(self, part_colors, color=-1):
+        colors = self.refs.get(part_colors, {})
+        if color == -1:
+            return [ref for bucket in colors.values() for ref in bucket.values()]
+        return list(colors.get(color, {}).values())
+
+    def shift(self, part_colors, color=-1, delete=False):
+        modifier = -1 if delete else 1
+        shifted = []
+
+        # Shift just part colors
+        if color == -1:
+            moved = {pc: colors for pc, colors in self.refs.items() if pc >= part_colors}
+            for pc in moved:
+                del self.refs[pc]
+            for pc, colors in moved.items():
+                for c, bucket in colors.items():
+                    for selector_id, (_, _, color_selector) in bucket.items():
+                        color_selector.part_colors += modifier
+                        self.keys[selector_id] = (pc + modifier, c)
+                        shifted.append(color_selector)
+                    self.get_bucket(pc + modifier, c).update(bucket)
+        # Shift colors
+        elif part_colors in self.refs:
+            colors = self.refs[part_colors]
+            moved = {c: bucket for c, bucket in colors.items() if c >= color}
+            for c in moved:
+                del colors[c]
+            for c, bucket in moved.items():
+                for selector_id, (_, _, color_selector) in bucket.items():
+                    color_selector.color += modifier
+                    self.keys[selector_id] = (part_colors, c + modifier)
+                    shifted.append(color_selector)
+                self.get_bucket(part_colors, c + modifier).update(bucket)
+            if not self.refs[part_colors]:
+                del self.refs[part_colors]
+        return shifted
+
+    def remap(self, removed, part_colors=None):
+        # removed holds the sorted part color indexes, or color indexes of part_colors, that are gone.
+        # Everything after them moves down in one pass, returns (color selector, old index) pairs
+        table = self.refs if part_colors is None else self.refs.get(part_colors)
+        if not removed or not table:
+            return []
+        moved = {key: value for key, value in table.items() if key > removed[0]}
+        for key in moved:
+            del table[key]
+        shifted = []
+        for key, value in moved.items():
+            new_key = key - bisect_left(removed, key)
+            table[new_key] = value
+            if part_colors is None:
+                for c, bucket in value.items():
+                    for selector_id, (_, _, color_selector) in bucket.items():
+                        color_selector.part_colors = new_key
+                        self.keys[selector_id] = (new_key, c)
+                        shifted.append((color_selector, key))
+            else:
+                for selector_id, (_, _, color_selector) in value.items():
+                    color_selector.color = new_key
+                    self.keys[selector_id] = (part_colors, new_key)
+                    shifted.append((color_selector, key))
+        return shifted
+
+    def get_bucket(self, part_colors, color):
+        return self.refs.setdefault(part_colors, {}).setdefault(color, {})
+
+    def pop_bucket_entry(self, key, selector_id):
+        colors = self.refs[key[0]]
+        bucket = colors[key[1]]
+        entry = bucket.pop(selector_id)
+        if not bucket:
+            del colors[key[1]]
+            if not colors:
+                del self.refs[key[0]]
+        return entry
+
+    @staticmethod
+    def discard(owners, owner_id, selector_id):
+        selector_ids = owners.get(owner_id)
+        if selector_ids is None:
+            return
+        selector_ids.discard(selector_id)
+        if not selector_ids:
+            del owners[owner_id]
@@ -0,0 +1,121 @@
+from collections import deque
+import json
+import os
+import threading
+import time
+
+from pubsub import pub
+from pubsub.utils.notification import IgnoreNotificationsMixin
+
+MAX_EVENTS = 100000
+
+
+class Stats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, elapsed):
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+
+
+def get_listener_name(listener):
+    func = listener.getCallable()
+    return getattr(func, '__qualname__', repr(func))
+
+
+class Diagnostics(IgnoreNotificationsMixin):
+    # Times every pubsub message and each of its listeners while enabled
+    def __init__(self):
+        self.enabled = False
+        self.installed = False
+        self.clear()
+
+    def clear(self):
+        self.topics = {}
+        self.listeners = {}
+        self.events = deque(maxlen=MAX_EVENTS)
+        self.stack = []
+        self.start = time.perf_counter()
+
+    def enable(self):
+        if not self.installed:
+            pub.addNotificationHandler(self)
+            self.installed = True
+        self.stack = []
+        pub.setNotificationFlags(sendMessage=True)
+        self.enabled = True
+
+    def disable(self):
+        pub.setNotificationFlags(sendMessage=False)
+        self.enabled = False
+
+    def notifySend(self, stage, topicObj, pubListener=None):
+        # Messages sent from worker threads would mess up the nesting
+        if not self.enabled or threading.current_thread() is not threading.main_thread():
+            return
+        now = time.perf_counter()
+        name = topicObj.getName()
+        if stage == 'pre':
+            # [topic, start, current listener, listener start]
+            self.stack.append([name, now, None, None])
+        elif stage == 'in':
+            if not self.stack:
+                return
+            frame = self.stack[-1]
+            self.end_listener(frame, now)
+            frame[2] = get_listener_name(pubListener)
+            frame[3] = now
+        elif stage == 'post':
+            # A listener that raised never gets its post, drop whatever it left behind
+            while self.stack and self.stack[-1][0] != name:
+                self.stack.pop()
+            if not self.stack:
+                return
+            frame = self.stack.pop()
+            self.end_listener(frame, now)
+            self.topics.setdefault(name, Stats()).add(now - frame[1])
+            self.add_event(name, 'topic', frame[1], now)
+
+    def end_listener(self, frame, now):
+        if frame[2] is None:
+            return
+        key = (frame[0], frame[2])
+        self.listeners.setdefault(key, Stats()).add(now - frame[3])
+        self.add_event(frame[2], 'listener', frame[3], now, topic=frame[0])
+        frame[2] = None
+
+    def add_event(self, name, category, start, end, **args):
+        self.events.append((name, category, start, end, args))
+
+    def get_rows(self):
+        # (topic, listener, stats), topics first with their listeners below, slowest first
+        rows = []
+        for topic, stats in sorted(self.topics.items(), key=lambda t: -t[1].total):
+            rows.append((topic, '', stats))
+            listeners = [(key[1], s) for key, s in self.listeners.items() if key[0] == topic]
+            for listener, listener_stats in sorted(listeners, key=lambda l: -l[1].total):
+                rows.append((topic, listener, listener_stats))
+        return rows
+
+    def export_trace(self, path):
+        # Chrome trace event format, open it with chrome://tracing or Perfetto
+        pid = os.getpid()
+        events = [{
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (start - self.start) * 1e6,
+            'dur': (end - start) * 1e6,
+            'pid': pid,
+            'tid': 1,
+            'args': args,
+        } for name, category, start, end, args in self.events]
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+diagnostics = Diagnostics()
@@ -0,0 +1,103 @@
+import wx
+
+from yabcs.diagnostics import diagnostics
+
+
+class StatsList(wx.ListCtrl):
+    columns = [('Topic', 170), ('Listener', 250), ('Calls', 60), ('Total (ms)', 80), ('Max (ms)', 80),
+               ('Mean (ms)', 80)]
+
+    def __init__(self, parent):
+        super().__init__(parent, -1, size=(-1, 300), style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        for name, width in self.columns:
+            self.AppendColumn(name, width=width)
+        self.rows = []
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.SetItemCount(len(rows))
+        self.Refresh()
+
+    def OnGetItemText(self, item, col):
+        topic, listener, stats = self.rows[item]
+        if col == 0:
+            return '' if listener else topic
+        if col == 1:
+            return listener
+        if col == 2:
+            return str(stats.count)
+        if col == 3:
+            return f'{stats.total * 1000:.2f}'
+        if col == 4:
+            return f'{stats.max * 1000:.2f}'
+        return f'{stats.total * 1000 / stats.count:.2f}'
+
+
+class DiagnosticsDialog(wx.Dialog):
+    def __init__(self, parent, *args, **kw):
+        super().__init__(parent, *args, **kw, style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.SetTitle("Diagnostics")
+
+        self.sizer = wx.BoxSizer(wx.VERTICAL)
+
+        self.record_ctrl = wx.CheckBox(self, -1, 'Record message timings')
+        self.record_ctrl.SetValue(diagnostics.enabled)
+        self.record_ctrl.Bind(wx.EVT_CHECKBOX, self.on_record)
+        self.sizer.Add(self.record_ctrl, 0, wx.ALL, 10)
+
+        self.stats = StatsList(self)
+        self.stats.SetMinSize((720, 300))
+        self.sizer.Add(self.stats, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+
+        button_sizer = wx.BoxSizer()
+        refresh_button = wx.Button(self, -1, "Refresh")
+        refresh_button.Bind(wx.EVT_BUTTON, self.on_refresh)
+        clear_button = wx.Button(self, -1, "Clear")
+        clear_button.Bind(wx.EVT_BUTTON, self.on_clear)
+        export_button = wx.Button(self, -1, "Export Trace...")
+        export_button.Bind(wx.EVT_BUTTON, self.on_export)
+        button_sizer.Add(refresh_button, 0, wx.ALL, 2)
+        button_sizer.Add(clear_button, 0, wx.ALL, 2)
+        button_sizer.Add(export_button, 0, wx.ALL, 2)
+        button_sizer.Add(wx.Button(self, wx.ID_CANCEL, "Close"), 0, wx.ALL, 2)
+        self.sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_RIGHT, 8)
+
+        self.status_bar = wx.StatusBar(self)
+        self.sizer.Add(self.status_bar, 0, wx.EXPAND)
+
+        self.Bind(wx.EVT_SHOW, self.on_show)
+
+        self.SetSizer(self.sizer)
+        self.sizer.Fit(self)
+        self.Layout()
+
+    def on_show(self, e):
+        if e.IsShown():
+            self.on_refresh(None)
+
+    def on_record(self, _):
+        if self.record_ctrl.GetValue():
+            diagnostics.enable()
+            self.status_bar.SetStatusText("Recording")
+        else:
+            diagnostics.disable()
+            self.status_bar.SetStatusText("Stopped recording")
+
+    def on_refresh(self, _):
+        self.stats.set_rows(diagnostics.get_rows())
+
+    def on_clear(self, _):
+        diagnostics.clear()
+        self.on_refresh(None)
+
+    def on_export(self, _):
+        with wx.FileDialog(self, "Export trace as...", "", "trace.json", "*.json", wx.FD_SAVE) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
+                return
+            path = dlg.GetPath()
+        try:
+            diagnostics.export_trace(path)
+        except OSError as e:
+            self.status_bar.SetStatusText(f"Could not export: {e}")
+            return
+        self.status_bar.SetStatusText(f"Exported {len(diagnostics.events)} event(s) to {path}")
@@ -3,17 +3,68 @@ import re
 import wx
 
 from pubsub import pub
-from pyxenoverse.gui import get_first_item, get_next_item
+from pyxenoverse.bcs.color_selector import ColorSelector
+from pyxenoverse.bcs.part_set import BCS_PART_LIST
+from pyxenoverse.gui import get_first_item
 from pyxenoverse.gui.ctrl.hex_ctrl import HexCtrl
 from pyxenoverse.gui.ctrl.multiple_selection_box import MultipleSelectionBox
 from pyxenoverse.gui.ctrl.single_selection_box import SingleSelectionBox
 from pyxenoverse.gui.ctrl.unknown_hex_ctrl import UnknownHexCtrl
 
+from yabcs.query import Query
+from yabcs.replace import is_valid_color
 from yabcs.utils import FIND_ITEM_TYPES, color_db
 
 pattern = re.compile(r'([ \n/_])([a-z0-9]+)')
 
 
+class ResultsList(wx.ListCtrl):
+    columns = [('Part Set', 60), ('Part', 100), ('Entry', 110), ('Value', 150)]
+
+    def __init__(self, parent):
+        super().__init__(parent, -1, size=(-1, 200), style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL)
+        for name, width in self.columns:
+            self.AppendColumn(name, width=width)
+        self.entry_type = None
+        self.records = []
+
+    def set_results(self, entry_type, records):
+        self.entry_type = entry_type
+        self.records = records
+        self.SetItemCount(len(records))
+        self.Refresh()
+
+    def clear(self):
+        self.set_results(None, [])
+
+    def OnGetItemText(self, item, col):
+        record = self.records[item]
+        if col == 3:
+            return self.format_value(record[self.entry_type])
+        return self.get_location(record, col)
+
+    @staticmethod
+    def format_value(value):
+        return value if isinstance(value, str) else f'{value} (0x{value:X})'
+
+    @staticmethod
+    def get_location(record, col):
+        # Positions are looked up again as entries may have moved since the search
+        position = color_db.find_index.get_position(record)
+        if position is None:
+            return '-'
+        part_set_index, part_index, kind, sub_index = position
+        if col == 0:
+            return str(part_set_index)
+        if col == 1:
+            return BCS_PART_LIST[part_index].replace('_', ' ').title()
+        if kind == 1:
+            return f'Color Selector {sub_index}'
+        if kind == 2:
+            return f'Physics {sub_index}'
+        return ''
+
+
 class FindDialog(wx.Dialog):
     def __init__(self, parent, main_panel, *args, **kw):
         super().__init__(parent, *args, **kw, style=wx.DEFAULT_DIALOG_STYLE | wx.STAY_ON_TOP)
@@ -43,23 +94,35 @@ class FindDialog(wx.Dialog):
         self.find_ctrl.Bind(wx.EVT_TEXT_ENTER, self.on_find)
         self.find_ctrl.SetFocus()
 
-        self.grid_sizer = wx.FlexGridSizer(rows=4, cols=2, hgap=10, vgap=10)
+        self.regex_ctrl = wx.CheckBox(self, -1, 'Regex')
+
+        self.grid_sizer = wx.FlexGridSizer(rows=5, cols=2, hgap=10, vgap=10)
         self.grid_sizer.Add(wx.StaticText(self, -1, 'Type: '))
         self.grid_sizer.Add(self.items, 0, wx.EXPAND)
         self.grid_sizer.Add(wx.StaticText(self, -1, 'Entry: '))
         self.grid_sizer.Add(self.entry, 0, wx.EXPAND)
         self.grid_sizer.Add(wx.StaticText(self, -1, 'Find: '))
         self.grid_sizer.Add(self.find_ctrl, 0, wx.EXPAND)
+        self.grid_sizer.AddSpacer(0)
+        self.grid_sizer.Add(self.regex_ctrl)
         self.hsizer.Add(self.grid_sizer, 0, wx.ALL, 10)
 
         self.button_sizer = wx.BoxSizer(wx.VERTICAL)
         self.find_button = wx.Button(self, -1, "Find Next")
         self.find_button.Bind(wx.EVT_BUTTON, self.on_find)
 
+        self.find_all_button = wx.Button(self, -1, "Find All")
+        self.find_all_button.Bind(wx.EVT_BUTTON, self.on_find_all)
+
         self.button_sizer.Add(self.find_button, 0, wx.ALL, 2)
+        self.button_sizer.Add(self.find_all_button, 0, wx.ALL, 2)
         self.button_sizer.Add(wx.Button(self, wx.ID_CANCEL, "Cancel"), 0, wx.ALL, 2)
         self.hsizer.Add(self.button_sizer, 0, wx.ALL, 8)
 
+        self.results = ResultsList(self)
+        self.results.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_result_selected)
+        self.sizer.Add(self.results, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+
         self.status_bar = wx.StatusBar(self)
         self.sizer.Add(self.status_bar, 0, wx.EXPAND)
 
@@ -136,35 +199,48 @@ class FindDialog(wx.Dialog):
         self.SetFocus()
         self.status_bar.SetStatusText('')
 
-    def find(self, selected, item_type, entry_type, find):
-        if not selected.IsOk():
-            self.status_bar.SetStatusText('No matches found')
-            return
-        # Get next item
-        item = get_next_item(self.part_sets_list, selected)
-        if not item.IsOk():
-            item, _ = get_first_item(self.part_sets_list)
-
-        # Loop over
-        while item != selected:
-            data = self.part_sets_list.GetItemData(item)
-            if (type(data) == item_type and
-                    (find is None or
-                     (isinstance(find, int) and data[entry_type] == find) or
-                     (isinstance(find, str) and find.lower() in data[entry_type].lower()))):
-                self.select_found(item, entry_type)
+    def get_position(self, item):
+        root = self.part_sets_list.GetRootItem()
+        while item.IsOk() and item != root:
+            position = color_db.find_index.get_position(self.part_sets_list.GetItemData(item))
+            if position is not None:
+                return position
+            item = self.part_sets_list.GetItemParent(item)
+        return None
+
+    def get_tree_item(self, part_set_index, record):
+        part_set_item = self.part_sets_list.get_item(('part_sets', part_set_index))
+        if part_set_item is None:
+            return None
+        pub.sendMessage('populate_part_set', item=part_set_item)
+        path = color_db.journal.get_path(record)
+        return self.part_sets_list.get_item(path) if path else None
+
+    def find(self, selected, item_type, entry_type, query):
+        after = self.get_position(selected) if selected.IsOk() else None
+        first = None
+        while True:
+            position, record = color_db.find_index.find_next(item_type, entry_type, query, after)
+            if record is None or position == first:
                 break
+            first = first or position
 
-            item = get_next_item(self.part_sets_list, item)
-            if not item.IsOk():
-                item, _ = get_first_item(self.part_sets_list)
-        else:
-            self.status_bar.SetStatusText('No matches found')
+            # Color selectors with invalid part colors are not in the tree
+            item = self.get_tree_item(position[0], record)
+            if item:
+                self.select_found(item, entry_type)
+                return item
+            after = position
+        self.status_bar.SetStatusText('No matches found')
 
-    def on_find(self, _):
+    def get_query(self):
         if not color_db.bcs:
             self.status_bar.SetStatusText("BCS not loaded")
-            return
+            return None, None, None
+        # Part sets are still being added to the tree
+        if self.root.loading:
+            self.status_bar.SetStatusText("BCS still loading")
+            return None, None, None
         # Get Item Type
         selection = self.items.GetSelection()
         item_type, fields = FIND_ITEM_TYPES[selection]
@@ -174,16 +250,45 @@ class FindDialog(wx.Dialog):
         entry_type = fields[selection]
 
         # Get Find value
-        find = self.find_ctrl.GetValue()
-        if "name" not in entry_type:
-            try:
-                find = int(find, 0)
-            except ValueError:
-                self.status_bar.SetStatusText("Invalid Value")
-                return
+        try:
+            query = Query(self.find_ctrl.GetValue(), "name" not in entry_type, self.regex_ctrl.GetValue())
+        except ValueError:
+            self.status_bar.SetStatusText("Invalid Value")
+            return None, None, None
+        return item_type, entry_type, query
+
+    def on_find(self, _):
+        item_type, entry_type, query = self.get_query()
+        if query is None:
+            return
         selected = self.part_sets_list.GetSelections()
         if len(selected) == 1:
             selected = selected[0]
         else:
             selected, _ = get_first_item(self.part_sets_list)
-        self.find(selected, item_type, entry_type, find)
+        self.find(selected, item_type, entry_type, query)
+
+    def on_find_all(self, _):
+        item_type, entry_type, query = self.get_query()
+        if query is None:
+            self.results.clear()
+            return
+        positions, records = color_db.find_index.search(item_type, entry_type, query)
+
+        # Color selectors with invalid part colors are not in the tree
+        if item_type == ColorSelector:
+            records = [record for record in records if is_valid_color(record.part_colors, record.color)]
+        self.results.set_results(entry_type, records)
+        self.status_bar.SetStatusText(f"Found {len(records)} match(es)")
+
+    def on_result_selected(self, e):
+        if self.root.loading:
+            self.status_bar.SetStatusText("BCS still loading")
+            return
+        record = self.results.records[e.GetIndex()]
+        position = color_db.find_index.get_position(record)
+        item = self.get_tree_item(position[0], record) if position is not None else None
+        if not item:
+            self.status_bar.SetStatusText("Entry no longer exists")
+            return
+        self.select_found(item, self.results.entry_type)
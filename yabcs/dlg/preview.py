@@ -0,0 +1,59 @@
+import wx
+
+from yabcs.dlg.find import ResultsList
+
+
+class PreviewList(ResultsList):
+    columns = ResultsList.columns[:3] + [('Old', 150), ('New', 150), ('Status', 70)]
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.changes = []
+        self.skipped = 0
+
+    def set_changes(self, change_set):
+        # Skipped entries are listed after the ones that will change
+        self.changes = change_set.changes + change_set.skipped
+        self.skipped = len(change_set.skipped)
+        self.SetItemCount(len(self.changes))
+        self.Refresh()
+
+    def OnGetItemText(self, item, col):
+        change = self.changes[item]
+        if col == 3:
+            return self.format_value(change.old)
+        if col == 4:
+            return self.format_value(change.new)
+        if col == 5:
+            return 'Skipped' if item >= len(self.changes) - self.skipped else 'Replace'
+        return self.get_location(change.record, col)
+
+
+class PreviewDialog(wx.Dialog):
+    def __init__(self, parent, change_set, *args, **kw):
+        super().__init__(parent, *args, **kw, style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.SetTitle("Replace Preview")
+
+        self.sizer = wx.BoxSizer(wx.VERTICAL)
+
+        msg = f'{len(change_set)} entry(s) will be replaced'
+        if change_set.skipped:
+            msg += f', {len(change_set.skipped)} will be skipped. Check your part colors'
+        self.sizer.Add(wx.StaticText(self, -1, msg), 0, wx.ALL, 10)
+
+        self.changes = PreviewList(self)
+        self.changes.SetMinSize((700, 300))
+        self.changes.set_changes(change_set)
+        self.sizer.Add(self.changes, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+
+        button_sizer = wx.StdDialogButtonSizer()
+        ok_button = wx.Button(self, wx.ID_OK, "Replace All")
+        ok_button.Enable(bool(change_set))
+        button_sizer.AddButton(ok_button)
+        button_sizer.AddButton(wx.Button(self, wx.ID_CANCEL, "Cancel"))
+        button_sizer.Realize()
+        self.sizer.Add(button_sizer, 0, wx.ALL | wx.ALIGN_RIGHT, 10)
+
+        self.SetSizer(self.sizer)
+        self.sizer.Fit(self)
+        self.Layout()
@@ -2,12 +2,12 @@ from enum import Enum
 
 import wx
 from wx.lib.dialogs import MultiMessageDialog
-from pubsub import pub
 
-from pyxenoverse.gui import get_first_item, get_next_item
+from pyxenoverse.gui import get_first_item
 from pyxenoverse.bcs.color_selector import ColorSelector
 from yabcs.dlg.find import FindDialog
-from yabcs.utils import FIND_ITEM_TYPES, color_db
+from yabcs.dlg.preview import PreviewDialog, PreviewList
+from yabcs.replace import plan_changes, plan_replace
 
 
 class Replace(Enum):
@@ -34,88 +34,125 @@ class ReplaceDialog(FindDialog):
         self.replace_all_button = wx.Button(self, -1, "Replace All")
         self.replace_all_button.Bind(wx.EVT_BUTTON, self.on_replace_all)
         self.replace_all_button.MoveAfterInTabOrder(self.replace_button)
+        self.preview_button = wx.Button(self, -1, "Preview")
+        self.preview_button.Bind(wx.EVT_BUTTON, self.on_preview)
+        self.preview_button.MoveAfterInTabOrder(self.replace_all_button)
 
         self.button_sizer.Insert(1, self.replace_button, 0, wx.ALL, 2)
         self.button_sizer.Insert(2, self.replace_all_button, 0, wx.ALL, 2)
+        self.button_sizer.Insert(3, self.preview_button, 0, wx.ALL, 2)
 
         self.sizer.Fit(self)
         self.Layout()
 
-    def on_replace(self, _):
-        if not color_db.bcs:
-            self.status_bar.SetStatusText("BCS Not Loaded")
-            return
-        item_type, fields = FIND_ITEM_TYPES[self.items.GetSelection()]
-        entry_type = fields[self.entry.GetSelection()]
-        find = self.find_ctrl.GetValue()
+    def get_replace_query(self):
+        item_type, entry_type, query = self.get_query()
+        if query is None:
+            return None
         replace = self.replace_ctrl.GetValue()
-        if "name" not in entry_type:
+        if query.numeric:
             try:
-                find = int(find, 0)
                 replace = int(replace, 0)
             except ValueError:
                 self.status_bar.SetStatusText("Invalid Value")
-                return
+                return None
+        return item_type, entry_type, query, replace
+
+    def on_replace(self, _):
+        replace_query = self.get_replace_query()
+        if replace_query is None:
+            return
+        item_type, entry_type, query, replace = replace_query
         selected = self.part_sets_list.GetSelections()
 
         # Only do this if we have don't have one selected item
         if len(selected) != 1:
             item, _ = get_first_item(self.part_sets_list)
-            self.find(item, item_type, entry_type, find)
+            if self.find(item, item_type, entry_type, query):
+                self.show_pending(item, item_type, entry_type, query, replace)
             return
         selected = selected[0]
         data = self.part_sets_list.GetItemData(selected)
 
         # Check to see if current entry is not one we're looking for
-        res = self.replace_item(data, item_type, entry_type, find, replace)
+        try:
+            res = self.replace_item(data, item_type, entry_type, query, replace)
+        except ValueError:
+            self.status_bar.SetStatusText("Invalid Value")
+            return
 
-        # Reload if replaced
+        # Reload if replaced, the tree is relabeled from the document's change events
         if res == Replace.REPLACED:
             self.main_panel.pages["Part Sets"].on_select(None)
 
         # Find next item to replace
-        self.find(selected, item_type, entry_type, find)
+        item = self.find(selected, item_type, entry_type, query)
+        msg = ''
         if res == Replace.REPLACED:
-            self.status_bar.SetStatusText(f"Replaced 1 entry")
+            msg = "Replaced 1 entry. "
         elif res == Replace.SKIPPED:
-            self.status_bar.SetStatusText(f"Skipped 1 entry. Check your part colors")
-
-    def on_replace_all(self, _):
-        if not color_db.bcs:
-            self.status_bar.SetStatusText("BCS Not Loaded")
+            msg = "Skipped 1 entry. Check your part colors. "
+        if item:
+            self.show_pending(item, item_type, entry_type, query, replace, msg)
+        elif msg:
+            self.status_bar.SetStatusText(msg + "No more matches")
+
+    def show_pending(self, item, item_type, entry_type, query, replace, msg=''):
+        # Single Replace works on the found entry, so show what it will change to
+        try:
+            change_set = self.plan_item(self.part_sets_list.GetItemData(item), item_type, entry_type, query, replace)
+        except ValueError:
+            change_set = None
+        if change_set:
+            change = change_set.changes[0]
+            msg += f"Next: {PreviewList.format_value(change.old)} -> {PreviewList.format_value(change.new)}"
+        elif change_set is not None and change_set.skipped:
+            msg += "Next entry will be skipped. Check your part colors"
+        if msg:
+            self.status_bar.SetStatusText(msg)
+
+    def plan(self):
+        replace_query = self.get_replace_query()
+        if replace_query is None:
+            return None
+        item_type, entry_type, query, replace = replace_query
+        try:
+            return item_type, entry_type, replace, plan_replace(item_type, entry_type, query, replace)
+        except ValueError:
+            self.status_bar.SetStatusText("Invalid Value")
+            return None
+
+    def on_preview(self, _):
+        plan = self.plan()
+        if plan is None:
             return
-        item_type, fields = FIND_ITEM_TYPES[self.items.GetSelection()]
-        entry_type = fields[self.entry.GetSelection()]
-        find = self.find_ctrl.GetValue()
-        replace = self.replace_ctrl.GetValue()
-        if "name" not in entry_type:
-            try:
-                find = int(self.find_ctrl.GetValue(), 0)
-                replace = int(self.replace_ctrl.GetValue(), 0)
-            except ValueError:
-                self.status_bar.SetStatusText("Invalid Value")
+        item_type, entry_type, replace, change_set = plan
+        if not change_set and not change_set.skipped:
+            self.status_bar.SetStatusText("No matches found")
+            return
+        with PreviewDialog(self, change_set) as dlg:
+            if dlg.ShowModal() != wx.ID_OK:
                 return
-        count = 0
-        skipped = 0
-        skipped_entries = set()
-        item, _ = get_first_item(self.part_sets_list)
-        while item.IsOk():
-            data = self.part_sets_list.GetItemData(item)
-            res = self.replace_item(data, item_type, entry_type, find, replace, skipped_entries)
-            if res == Replace.REPLACED:
-                count += 1
-            elif res == Replace.SKIPPED:
-                skipped += 1
-            item = get_next_item(self.part_sets_list, item)
-
-        self.main_panel.pages["Part Sets"].on_select(None)
-        pub.sendMessage('reindex_part_sets')
-        msg = f'Replaced {count} entry(s) (skipped {skipped}). '
+        self.apply(item_type, entry_type, replace, change_set)
+
+    def on_replace_all(self, _):
+        plan = self.plan()
+        if plan is not None:
+            self.apply(*plan)
+
+    def apply(self, item_type, entry_type, replace, change_set):
+        change_set.apply()
+        if change_set:
+            self.main_panel.pages["Part Sets"].on_select(None)
+
+        skipped = len(change_set.skipped)
+        msg = f'Replaced {len(change_set)} entry(s) (skipped {skipped}). '
         if skipped:
             msg += "Check your part colors"
         self.status_bar.SetStatusText(msg)
 
-        if item_type == ColorSelector and skipped_entries:
+        if item_type == ColorSelector and skipped:
+            skipped_entries = set((c.record.part_colors, c.record.color) for c in change_set.skipped)
             if entry_type == "part_colors":
                 msg = "\n".join(f" * Color Selector ({cs[0]}, {cs[1]}) -> ({replace}, {cs[1]})"
                                 for cs in sorted(skipped_entries))
@@ -127,31 +164,18 @@ class ReplaceDialog(FindDialog):
                 dlg.ShowModal()
 
     @staticmethod
-    def get_color_selector_indexes(data, entry_type, replace):
-        if entry_type == "part_colors":
-            part_colors_index = replace
-            color_index = data.color
-        else:
-            part_colors_index = data.part_colors
-            color_index = replace
-        return part_colors_index, color_index
-
-    def replace_item(self, data, item_type, entry_type, find, replace, skipped=None):
-        if type(data) == item_type:
-            if item_type == ColorSelector and data[entry_type] == find:
-                part_colors_index, color_index = self.get_color_selector_indexes(data, entry_type, replace)
-                try:
-                    value = color_db[part_colors_index][color_index]
-                    data[entry_type] = replace
-                except IndexError:
-                    if skipped is not None:
-                        skipped.add((data.part_colors, data.color))
-                    return Replace.SKIPPED
-            else:
-                if isinstance(find, int) and data[entry_type] == find:
-                    data[entry_type] = replace
-                    return Replace.REPLACED
-                elif isinstance(find, str) and find in data[entry_type]:
-                    data[entry_type] = data[entry_type].replace(find, replace)
-                    return Replace.REPLACED
+    def plan_item(data, item_type, entry_type, query, replace):
+        if type(data) != item_type or not query.match(data[entry_type]):
+            return None
+        return plan_changes([data], item_type, entry_type, query, replace)
+
+    def replace_item(self, data, item_type, entry_type, query, replace):
+        change_set = self.plan_item(data, item_type, entry_type, query, replace)
+        if change_set is None:
+            return Replace.NOT_REPLACED
+        if change_set:
+            change_set.apply('Replace')
+            return Replace.REPLACED
+        if change_set.skipped:
+            return Replace.SKIPPED
         return Replace.NOT_REPLACED
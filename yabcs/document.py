@@ -0,0 +1,299 @@
+from contextlib import contextmanager
+
+from pyxenoverse.bcs.part_set import PartSet
+from pyxenoverse.bcs.part import Part
+from pyxenoverse.bcs.color_selector import ColorSelector
+from pyxenoverse.bcs.part_color import PartColor
+from pyxenoverse.bcs.color import Color
+
+from yabcs.journal import FieldChange, StateChange, Insert, Remove, resolve, snapshot
+
+
+class Event:
+    # insert and remove are for top level entries, change is a field of the record at path and
+    # rebuild means the children of the top level entry changed. record is always the top level entry.
+    def __init__(self, kind, path, record):
+        self.kind = kind
+        self.path = path
+        self.record = record
+
+    def __repr__(self):
+        return f'Event({self.kind!r}, {self.path!r})'
+
+
+def compact(events):
+    # Only the last rebuild of an entry matters, and none if it was removed afterwards.
+    # Entries inserted in the same batch already get their children as they end up.
+    last = {}
+    for i, event in enumerate(events):
+        if event.kind in ('rebuild', 'remove'):
+            last[id(event.record)] = i
+    inserted = set()
+    result = []
+    for i, event in enumerate(events):
+        key = id(event.record)
+        if event.kind == 'insert':
+            inserted.add(key)
+        elif event.kind == 'remove':
+            inserted.discard(key)
+        elif event.kind == 'rebuild' and (key in inserted or last[key] != i):
+            continue
+        result.append(event)
+    return result
+
+
+class BcsDocument:
+    # Edits the BCS and keeps the journal, color selector refs and find index in step with it.
+    # Listeners get the list of events once an edit, or a whole batch of them, is done.
+    def __init__(self, bcs, refs, find_index, journal):
+        self.bcs = bcs
+        self.refs = refs
+        self.find_index = find_index
+        self.journal = journal
+        self.listeners = []
+        self.events = None
+        self.depth = 0
+
+    @contextmanager
+    def batch(self):
+        self.depth += 1
+        if self.depth == 1:
+            self.events = []
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                events, self.events = self.events, None
+                self.emit(events)
+
+    def emit(self, events):
+        if self.events is not None:
+            self.events.extend(events)
+            return
+        events = compact(events)
+        if not events:
+            return
+        for listener in self.listeners:
+            listener(events)
+
+    def get_top(self, path):
+        return getattr(self.bcs, path[0])[path[1]]
+
+    def get_path(self, record):
+        return self.journal.get_path(record)
+
+    def insert(self, name, index, entries):
+        container = getattr(self.bcs, name)
+        events = []
+        for i, entry in enumerate(entries, index):
+            container.insert(i, entry)
+            self.journal.add(Insert((name, i), entry))
+            if isinstance(entry, PartSet):
+                self.refs.add_part_set(entry)
+            elif isinstance(entry, PartColor):
+                self.shift_colors(i)
+            events.append(Event('insert', (name, i), entry))
+        if name == 'part_sets':
+            self.find_index.invalidate()
+        self.emit(events)
+
+    def insert_children(self, path, field, index, entries):
+        parent = resolve(self.bcs, path)
+        container = getattr(parent, field)
+        top = self.get_top(path)
+        for i, entry in enumerate(entries, index):
+            container.insert(i, entry)
+            self.journal.add(Insert(path + (field, i), entry))
+            if isinstance(entry, ColorSelector):
+                self.refs.add(top, parent, entry)
+            elif isinstance(entry, Color):
+                self.shift_colors(path[1], i)
+        if path[0] == 'part_sets':
+            self.find_index.invalidate(top)
+        self.emit([Event('rebuild', path[:2], top)])
+
+    def add_part(self, path, part_name, part):
+        part_set = resolve(self.bcs, path)
+        part_set.parts[part_name] = part
+        self.journal.add(Insert(path + ('parts', part_name), part))
+        self.refs.add_part(part_set, part)
+        self.find_index.invalidate(part_set)
+        self.emit([Event('rebuild', path[:2], part_set)])
+
+    def remove(self, paths):
+        # Entries are grouped by the list holding them, each list is compacted once and the color selectors
+        # pointing past removed part colors or colors are remapped once. Part colors and colors still in use
+        # are left alone, returns (path, conflicts) for them.
+        groups = {}
+        for path in paths:
+            groups.setdefault(path[:-1], set()).add(path[-1])
+
+        # Nested lists go first, so the indexes above them still hold
+        skipped = []
+        for container_path, keys in sorted(groups.items(), key=lambda group: -len(group[0])):
+            field = container_path[-1]
+            if field in ('part_colors', 'colors'):
+                part_colors = container_path[1] if field == 'colors' else None
+                used = {key: self.find_color_refs(key, part_colors) for key in keys}
+                used = {key: refs for key, refs in used.items() if refs}
+                if used:
+                    part_set_indexes = self.get_part_set_indexes()
+                    skipped.extend((container_path + (key,), self.format_conflicts(refs, part_set_indexes))
+                                   for key, refs in sorted(used.items()))
+                    keys -= used.keys()
+            if keys:
+                self.remove_keys(container_path, keys)
+        return skipped
+
+    def remove_keys(self, container_path, keys):
+        owner = resolve(self.bcs, container_path[:-1])
+        field = container_path[-1]
+        container = getattr(owner, field)
+        # Highest index first, so every journal op is valid when replayed in order
+        keys = sorted(keys, reverse=True) if not isinstance(container, dict) else list(keys)
+        records = [container[key] for key in keys]
+        for key, record in zip(keys, records):
+            self.journal.add(Remove(container_path + (key,), record))
+            if isinstance(record, PartSet):
+                self.refs.remove_part_set(record)
+            elif isinstance(record, Part):
+                self.refs.remove_part(record)
+            elif isinstance(record, ColorSelector):
+                self.refs.remove(record)
+
+        if isinstance(container, dict):
+            for key in keys:
+                container.pop(key)
+        else:
+            # Drops all the indexes in one pass
+            indexes = set(keys)
+            container[:] = [entry for i, entry in enumerate(container) if i not in indexes]
+            if field == 'part_colors':
+                self.remap_colors(keys[::-1])
+            elif field == 'colors':
+                self.remap_colors(keys[::-1], container_path[1])
+
+        if len(container_path) == 1:
+            if field == 'part_sets':
+                self.find_index.invalidate()
+            self.emit([Event('remove', (field, key), record) for key, record in zip(keys, records)])
+            return
+        top = self.get_top(container_path)
+        if container_path[0] == 'part_sets':
+            self.find_index.invalidate(top)
+        self.emit([Event('rebuild', container_path[:2], top)])
+
+    def set_fields(self, label, changes):
+        # changes holds (record, field, new value), they are undone together
+        events = []
+        with self.journal.group(label):
+            for record, field, value in changes:
+                path = self.get_path(record)
+                old = record[field]
+                record[field] = value
+                if isinstance(record, ColorSelector):
+                    self.refs.update(record)
+                self.find_index.update(record)
+                if path is None:
+                    continue
+                self.journal.add(FieldChange(path, field, old, value))
+                events.append(Event('change', path, self.get_top(path)))
+        self.emit(events)
+
+    def clear_field(self, path, field):
+        record = resolve(self.bcs, path)
+        entries = getattr(record, field)
+        self.journal.add(FieldChange(path, field, entries, []))
+        if field == 'color_selectors':
+            self.refs.remove_part(record)
+        entries.clear()
+        top = self.get_top(path)
+        if path[0] == 'part_sets':
+            self.find_index.invalidate(top)
+        self.emit([Event('rebuild', path[:2], top)])
+
+    def paste(self, path, source, field=None):
+        # With a field, source is a list pasted over that list of the record at path
+        target = resolve(self.bcs, path)
+        top = self.get_top(path)
+        if path[0] == 'part_sets':
+            self.refs.remove_part_set(top)
+        state = snapshot(target)
+        if field:
+            getattr(target, f'paste_{field}')(source, False)
+        else:
+            target.paste(source)
+        self.journal.add(StateChange(path, state, snapshot(target)))
+        if path[0] == 'part_sets':
+            self.refs.add_part_set(top)
+            self.find_index.invalidate(top)
+        self.emit([Event('rebuild', path[:2], top)])
+
+    def find_color_refs(self, index, part_colors=None):
+        if part_colors is None:
+            return self.refs.find(index)
+        return self.refs.find(part_colors, index)
+
+    def get_part_set_indexes(self):
+        # Part set indexes are only needed to report conflicts
+        return {id(part_set): i for i, part_set in enumerate(self.bcs.part_sets)}
+
+    @staticmethod
+    def format_conflicts(refs, part_set_indexes):
+        conflicts = []
+        for part_set, part, _ in refs:
+            part_name = next((name for name, p in part_set.parts.items() if p is part), '')
+            conflicts.append((part_set_indexes.get(id(part_set), -1), part_name))
+        return sorted(conflicts)
+
+    def remap_colors(self, removed, part_colors=None):
+        field = 'part_colors' if part_colors is None else 'color'
+        shifted = self.refs.remap(removed, part_colors)
+        for color_selector, old in shifted:
+            self.find_index.update(color_selector)
+            self.journal.add(FieldChange(self.journal.get_path(color_selector), field, old, color_selector[field]))
+        return shifted
+
+    def shift_colors(self, part_color_index, color_index=-1, delete=False):
+        shifted = self.refs.shift(part_color_index, color_index, delete)
+        field = 'part_colors' if color_index == -1 else 'color'
+        modifier = -1 if delete else 1
+        for color_selector in shifted:
+            self.find_index.update(color_selector)
+            self.journal.add(FieldChange(self.journal.get_path(color_selector), field,
+                                         color_selector[field] - modifier, color_selector[field]))
+        return shifted
+
+    def apply_ops(self, ops, undo):
+        # Replays journal ops for undo and redo
+        events = []
+        for op in ops:
+            name, index = op.path[:2]
+            container = getattr(self.bcs, name)
+            before = container[index] if index < len(container) else None
+            kind = op.apply(self.bcs, undo)
+            if kind == 'remove':
+                top = before
+                if name == 'part_sets':
+                    self.refs.remove_part_set(top)
+                    self.find_index.invalidate()
+            elif kind == 'insert':
+                top = container[index]
+                if name == 'part_sets':
+                    self.refs.add_part_set(top)
+                    self.find_index.invalidate()
+            elif kind == 'change':
+                top = container[index]
+                record = resolve(self.bcs, op.path)
+                if isinstance(record, ColorSelector):
+                    self.refs.update(record)
+                self.find_index.update(record)
+            else:
+                top = container[index]
+                if name == 'part_sets':
+                    self.refs.remove_part_set(top)
+                    self.refs.add_part_set(top)
+                    self.find_index.invalidate(top)
+            events.append(Event(kind, op.path, top))
+        self.emit(events)
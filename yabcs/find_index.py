@@ -0,0 +1,142 @@
+from bisect import bisect_right
+
+from pyxenoverse.bcs.part_set import BCS_PART_LIST
+
+
+class FindIndex:
+    def __init__(self, item_types):
+        self.fields = {item_type: fields for item_type, fields in item_types}
+        self.clear()
+
+    def clear(self):
+        self.bcs = None
+        # (item type, field) -> value -> id(record) -> record
+        self.postings = {}
+        # id(record) -> (record, part set, position inside the part set, values)
+        self.records = {}
+        # id(part set) -> (part set, record ids)
+        self.part_sets = {}
+        self.dirty = {}
+        self.order = None
+        self.results = {}
+
+    def reset(self, bcs):
+        # Indexing is deferred until the first search
+        self.clear()
+        self.bcs = bcs
+
+    def invalidate(self, part_set=None):
+        if self.bcs is None:
+            return
+        self.results = {}
+        if part_set is None:
+            # Part sets were added, removed or moved
+            self.order = None
+        else:
+            self.dirty[id(part_set)] = part_set
+
+    def update(self, record):
+        record_id = id(record)
+        entry = self.records.get(record_id)
+        if entry is None or entry[0] is not record:
+            return
+        self.remove_record(record_id)
+        self.add_record(record, entry[1], entry[2], self.part_sets[id(entry[1])][1])
+        self.results = {}
+
+    def refresh(self):
+        if self.bcs is None:
+            return
+        if self.order is None:
+            self.order = {id(part_set): i for i, part_set in enumerate(self.bcs.part_sets)}
+            for part_set_id in [part_set_id for part_set_id in self.part_sets if part_set_id not in self.order]:
+                self.remove_part_set(part_set_id)
+            for part_set in self.bcs.part_sets:
+                if id(part_set) not in self.part_sets:
+                    self.add_part_set(part_set)
+        for part_set_id, part_set in self.dirty.items():
+            self.remove_part_set(part_set_id)
+            if part_set_id in self.order:
+                self.add_part_set(part_set)
+        self.dirty = {}
+
+    def add_part_set(self, part_set):
+        record_ids = set()
+        self.part_sets[id(part_set)] = (part_set, record_ids)
+        if part_set is None:
+            return
+        for part_index, part_name in enumerate(BCS_PART_LIST):
+            part = part_set.parts.get(part_name)
+            if part is None:
+                continue
+            self.add_record(part, part_set, (part_index, 0, 0), record_ids)
+            for i, color_selector in enumerate(part.color_selectors):
+                self.add_record(color_selector, part_set, (part_index, 1, i), record_ids)
+            for i, physics in enumerate(part.physics):
+                self.add_record(physics, part_set, (part_index, 2, i), record_ids)
+
+    def remove_part_set(self, part_set_id):
+        _, record_ids = self.part_sets.pop(part_set_id, (None, []))
+        for record_id in record_ids:
+            self.remove_record(record_id)
+
+    def add_record(self, record, part_set, position, record_ids):
+        item_type = type(record)
+        values = {}
+        for field in self.fields.get(item_type, []):
+            try:
+                values[field] = record[field]
+            except KeyError:
+                continue
+            postings = self.postings.setdefault((item_type, field), {})
+            postings.setdefault(values[field], {})[id(record)] = record
+        self.records[id(record)] = (record, part_set, position, values)
+        record_ids.add(id(record))
+
+    def remove_record(self, record_id):
+        entry = self.records.pop(record_id, None)
+        if entry is None:
+            return
+        record, _, _, values = entry
+        for field, value in values.items():
+            postings = self.postings[(type(record), field)]
+            del postings[value][record_id]
+            if not postings[value]:
+                del postings[value]
+
+    def get_position(self, data):
+        self.refresh()
+        return self.position(data)
+
+    def position(self, data):
+        entry = self.records.get(id(data))
+        if entry is not None and entry[0] is data:
+            return (self.order[id(entry[1])],) + entry[2]
+        if id(data) in self.part_sets and self.part_sets[id(data)][0] is data:
+            return self.order[id(data)],
+        return None
+
+    def search(self, item_type, field, query):
+        self.refresh()
+        key = (item_type, field, query.key)
+        if key not in self.results:
+            values = self.postings.get((item_type, field), {})
+            if query.exact is not None:
+                records = list(values.get(query.exact, {}).values())
+            else:
+                records = [record for value, bucket in values.items()
+                           if query.match(value) for record in bucket.values()]
+            matches = sorted(((self.position(record), record) for record in records), key=lambda m: m[0])
+            self.results[key] = ([m[0] for m in matches], [m[1] for m in matches])
+        return self.results[key]
+
+    def find_next(self, item_type, field, query, after=None):
+        positions, records = self.search(item_type, field, query)
+        if not positions:
+            return None, None
+        i = 0 if after is None else bisect_right(positions, after)
+        if i == len(positions):
+            i = 0
+        if positions[i] == after:
+            return None, None
+        return positions[i], records[i]
@@ -0,0 +1,229 @@
+from contextlib import contextmanager
+from itertools import chain
+import pickle
+import zlib
+
+from pyxenoverse.bcs.part_set import BCS_PART_LIST
+
+# Fields holding child entries, changing them means the tree below has to be rebuilt
+CONTAINER_FIELDS = ('parts', 'color_selectors', 'physics', 'colors', 'bone_scales', 'bones')
+SUB_ENTRIES = {'part_colors': 'colors', 'bodies': 'bone_scales', 'skeletons': 'bones'}
+
+
+def resolve(bcs, path):
+    data = bcs
+    for i in range(0, len(path), 2):
+        data = getattr(data, path[i])[path[i + 1]]
+    return data
+
+
+def snapshot(record):
+    return {name: pickle.dumps(value) for name, value in vars(record).items()}
+
+
+class FieldChange:
+    def __init__(self, path, field, old, new):
+        self.path = path
+        self.field = field
+        self.old = pickle.dumps(old)
+        self.new = pickle.dumps(new)
+
+    def get_size(self):
+        return len(self.old) + len(self.new)
+
+    def apply(self, bcs, undo):
+        setattr(resolve(bcs, self.path), self.field, pickle.loads(self.old if undo else self.new))
+        return 'rebuild' if self.field in CONTAINER_FIELDS else 'change'
+
+
+class StateChange:
+    # Only the attributes that differ between the two snapshots are kept
+    def __init__(self, path, old, new):
+        self.path = path
+        self.old = {name: value for name, value in old.items() if new.get(name) != value}
+        self.new = {name: value for name, value in new.items() if old.get(name) != value}
+
+    def __bool__(self):
+        return bool(self.old or self.new)
+
+    def get_size(self):
+        return sum(len(value) for value in chain(self.old.values(), self.new.values()))
+
+    def apply(self, bcs, undo):
+        record = resolve(bcs, self.path)
+        state, other = (self.old, self.new) if undo else (self.new, self.old)
+        for name in other:
+            if name not in state:
+                record.__dict__.pop(name, None)
+        for name, value in state.items():
+            record.__dict__[name] = pickle.loads(value)
+        return 'rebuild'
+
+
+class Insert:
+    def __init__(self, path, value):
+        self.path = path
+        self.value = pickle.dumps(value)
+
+    def get_size(self):
+        return len(self.value)
+
+    def apply(self, bcs, undo):
+        if undo:
+            return self.remove(bcs)
+        return self.insert(bcs)
+
+    def insert(self, bcs):
+        container = getattr(resolve(bcs, self.path[:-2]), self.path[-2])
+        value = pickle.loads(self.value)
+        if isinstance(container, dict):
+            container[self.path[-1]] = value
+        else:
+            container.insert(self.path[-1], value)
+        return 'insert' if len(self.path) == 2 else 'rebuild'
+
+    def remove(self, bcs):
+        container = getattr(resolve(bcs, self.path[:-2]), self.path[-2])
+        container.pop(self.path[-1])
+        return 'remove' if len(self.path) == 2 else 'rebuild'
+
+
+class Remove(Insert):
+    def apply(self, bcs, undo):
+        return super().apply(bcs, not undo)
+
+
+class Action:
+    def __init__(self, label):
+        self.label = label
+        self.ops = []
+        self.data = None
+
+    def compress(self):
+        if self.data is None:
+            self.data = zlib.compress(pickle.dumps(self.ops))
+            self.ops = None
+
+    def get_ops(self):
+        if self.data is not None:
+            return pickle.loads(zlib.decompress(self.data))
+        return self.ops
+
+    def get_size(self):
+        if self.data is not None:
+            return len(self.data)
+        return sum(op.get_size() for op in self.ops)
+
+
+class Journal:
+    def __init__(self, find_index, max_size=32 * 1024 * 1024, max_actions=500, uncompressed=10):
+        self.find_index = find_index
+        self.max_size = max_size
+        self.max_actions = max_actions
+        self.uncompressed = uncompressed
+        self.clear()
+
+    def clear(self):
+        self.bcs = None
+        self.undo_stack = []
+        self.redo_stack = []
+        self.action = None
+        self.depth = 0
+
+    def reset(self, bcs):
+        self.clear()
+        self.bcs = bcs
+
+    def get_path(self, record):
+        # Paths alternate between an attribute name and a key inside it, starting from the BCS
+        position = self.find_index.get_position(record)
+        if position is not None:
+            path = ('part_sets', position[0])
+            if len(position) == 1:
+                return path
+            part_index, kind, sub_index = position[1:]
+            path += ('parts', BCS_PART_LIST[part_index])
+            if kind == 1:
+                path += ('color_selectors', sub_index)
+            elif kind == 2:
+                path += ('physics', sub_index)
+            return path
+
+        for name, sub_name in SUB_ENTRIES.items():
+            for i, entry in enumerate(getattr(self.bcs, name)):
+                if entry is record:
+                    return name, i
+                if not entry:
+                    continue
+                for j, sub_entry in enumerate(getattr(entry, sub_name)):
+                    if sub_entry is record:
+                        return name, i, sub_name, j
+        return None
+
+    def begin(self, label):
+        if self.depth == 0:
+            self.action = Action(label)
+        self.depth += 1
+
+    def end(self):
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        action, self.action = self.action, None
+        if action.ops:
+            self.push(action)
+
+    @contextmanager
+    def group(self, label):
+        self.begin(label)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def add(self, *ops):
+        ops = [op for op in ops if op]
+        if not ops:
+            return
+        if self.action is not None:
+            self.action.ops.extend(ops)
+            return
+        action = Action('Edit')
+        action.ops.extend(ops)
+        self.push(action)
+
+    def record(self, label, ops):
+        with self.group(label):
+            self.add(*ops)
+
+    def push(self, action):
+        self.undo_stack.append(action)
+        self.redo_stack = []
+
+        # Older actions are rarely undone, so keep them compressed
+        if len(self.undo_stack) > self.uncompressed:
+            self.undo_stack[-self.uncompressed - 1].compress()
+
+        size = sum(action.get_size() for action in self.undo_stack)
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_actions or size > self.max_size):
+            size -= self.undo_stack.pop(0).get_size()
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def undo(self):
+        if not self.undo_stack:
+            return None
+        action = self.undo_stack.pop()
+        self.redo_stack.append(action)
+        return action.label, list(reversed(action.get_ops()))
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        action = self.redo_stack.pop()
+        self.undo_stack.append(action)
+        return action.label, action.get_ops()
@@ -1,6 +1,5 @@
 from functools import partial
 from itertools import chain
-import pickle
 import wx
 from wx.lib.dialogs import MultiMessageDialog
 import pyperclip
@@ -22,18 +21,145 @@ from pyxenoverse.gui.ctrl.multiple_selection_box import MultipleSelectionBox
 from pyxenoverse.gui.ctrl.single_selection_box import SingleSelectionBox
 from pyxenoverse.gui.ctrl.unknown_hex_ctrl import UnknownHexCtrl
 
+from yabcs import clipboard
+from yabcs.journal import SUB_ENTRIES, resolve
+from yabcs.reindex import get_children
 from yabcs.utils import color_db
 
 
+class EntryTreeCtrl(wx.TreeCtrl):
+    # Nodes are mapped to their path in the BCS, the maps are rebuilt on demand after the tree changes:
+    # the top level for the whole list, and everything below a top level entry separately.
+    def __init__(self, parent, list_name, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.list_name = list_name
+        self.clear_paths()
+
+    def AddRoot(self, *args, **kwargs):
+        self.clear_paths()
+        return super().AddRoot(*args, **kwargs)
+
+    def AppendItem(self, parent, *args, **kwargs):
+        self.invalidate_paths(parent)
+        return super().AppendItem(parent, *args, **kwargs)
+
+    def InsertItem(self, parent, *args, **kwargs):
+        self.invalidate_paths(parent)
+        return super().InsertItem(parent, *args, **kwargs)
+
+    def PrependItem(self, parent, *args, **kwargs):
+        self.invalidate_paths(parent)
+        return super().PrependItem(parent, *args, **kwargs)
+
+    def Delete(self, item):
+        parent = self.GetItemParent(item)
+        if parent == self.GetRootItem():
+            self.sub_paths.pop(item, None)
+            self.sub_items.pop(item, None)
+        self.invalidate_paths(parent)
+        super().Delete(item)
+
+    def DeleteChildren(self, item):
+        if item == self.GetRootItem():
+            self.clear_paths()
+        else:
+            self.invalidate_paths(item)
+        super().DeleteChildren(item)
+
+    def DeleteAllItems(self):
+        self.clear_paths()
+        super().DeleteAllItems()
+
+    def clear_paths(self):
+        self.top_items = None
+        self.top_positions = None
+        self.sub_paths = {}
+        self.sub_items = {}
+
+    def invalidate_paths(self, parent):
+        # parent is the node whose children changed
+        if not parent.IsOk() or parent == self.GetRootItem():
+            self.top_items = None
+            self.top_positions = None
+            return
+        top = self.get_top_item(parent)
+        self.sub_paths.pop(top, None)
+        self.sub_items.pop(top, None)
+
+    def get_top_item(self, item):
+        root = self.GetRootItem()
+        parent = self.GetItemParent(item)
+        while parent.IsOk() and parent != root:
+            item = parent
+            parent = self.GetItemParent(item)
+        return item
+
+    def get_top_positions(self):
+        if self.top_positions is None:
+            self.top_items = get_children(self, self.GetRootItem())
+            self.top_positions = {item: i for i, item in enumerate(self.top_items)}
+        return self.top_positions
+
+    def get_sub_paths(self, top):
+        paths = self.sub_paths.get(top)
+        if paths is None:
+            paths = {}
+            self.add_sub_paths(top, self.GetItemData(top), (), paths)
+            self.sub_paths[top] = paths
+            self.sub_items[top] = {path: item for item, path in paths.items()}
+        return paths
+
+    def add_sub_paths(self, item, data, path, paths):
+        # Keys come from the model, color selectors with invalid colors are not shown but keep their index
+        if isinstance(data, PartSet):
+            field, keys = 'parts', {id(part): name for name, part in data.parts.items()}
+        elif isinstance(data, Part):
+            field, keys = None, {id(data.color_selectors): 'color_selectors', id(data.physics): 'physics'}
+        elif isinstance(data, list):
+            field, keys = None, {id(entry): i for i, entry in enumerate(data)}
+        elif data and self.list_name in SUB_ENTRIES:
+            field = SUB_ENTRIES[self.list_name]
+            keys = {id(entry): i for i, entry in enumerate(getattr(data, field))}
+        else:
+            return
+        for child in get_children(self, item):
+            child_data = self.GetItemData(child)
+            key = keys.get(id(child_data))
+            if key is None:
+                continue
+            child_path = path + ((field, key) if field else (key,))
+            paths[child] = child_path
+            self.add_sub_paths(child, child_data, child_path, paths)
+
+    def get_path(self, item):
+        # The path of a Color Selectors or Physics list node ends with the field name
+        top = self.get_top_item(item)
+        path = (self.list_name, self.get_top_positions()[top])
+        if item == top:
+            return path
+        return path + self.get_sub_paths(top)[item]
+
+    def get_item(self, path):
+        self.get_top_positions()
+        if path[1] >= len(self.top_items):
+            return None
+        top = self.top_items[path[1]]
+        if len(path) == 2:
+            return top
+        self.get_sub_paths(top)
+        return self.sub_items[top].get(path[2:])
+
+
 class ListPanel(wx.Panel):
     def __init__(self, parent, name):
         wx.Panel.__init__(self, parent)
         self.parent = parent
         self.focus = None
         self.name = name
-        self.reindex_name = f"reindex_{name.replace(' ', '_').lower()}"
+        self.list_name = name.replace(' ', '_').lower()
+        self.reindex_name = f"reindex_{self.list_name}"
 
-        self.entry_list = wx.TreeCtrl(self, style=wx.TR_MULTIPLE | wx.TR_HAS_BUTTONS | wx.TR_FULL_ROW_HIGHLIGHT | wx.TR_LINES_AT_ROOT | wx.TR_HIDE_ROOT)
+        self.entry_list = EntryTreeCtrl(self, self.list_name, style=wx.TR_MULTIPLE | wx.TR_HAS_BUTTONS | wx.TR_FULL_ROW_HIGHLIGHT | wx.TR_LINES_AT_ROOT | wx.TR_HIDE_ROOT)
         self.entry_list.Bind(wx.EVT_TREE_ITEM_MENU, self.on_right_click)
         self.entry_list.Bind(wx.EVT_TREE_SEL_CHANGED, self.on_select)
         self.entry_list.SetDropTarget(FileDropTarget(self, "load_bcs"))
@@ -98,8 +224,8 @@ class ListPanel(wx.Panel):
                 dlg.ShowModal()
             return
 
-        self.cdo = wx.CustomDataObject("BCSEntry")
-        self.cdo.SetData(pickle.dumps(data))
+        self.cdo = wx.CustomDataObject(clipboard.FORMAT)
+        self.cdo.SetData(clipboard.encode(data))
         if wx.TheClipboard.Open():
             wx.TheClipboard.SetData(self.cdo)
             wx.TheClipboard.Flush()
@@ -112,18 +238,24 @@ class ListPanel(wx.Panel):
         else:
             pub.sendMessage('set_status_bar', text=f'Copied {len(data)} {item_type.get_readable_name()} items')
 
-    def get_paste_data(self):
-        cdo = wx.CustomDataObject("BCSEntry")
+    def get_paste_data(self, decode=True):
+        cdo = wx.CustomDataObject(clipboard.FORMAT)
         success = False
         if wx.TheClipboard.Open():
             success = wx.TheClipboard.GetData(cdo)
             wx.TheClipboard.Close()
-        if not success:
-            self.paste_data = []
+        header = clipboard.read_header(bytes(cdo.GetData())) if success else None
+        self.paste_data = []
+        if not header:
+            self.paste_data_type = None
+            self.paste_data_actual_type = None
             return
-        self.paste_data = pickle.loads(cdo.GetData())
-        self.paste_data_actual_type = type(self.paste_data[0])
-        self.paste_data_type = type(self.paste_data[0][0]) if self.paste_data_actual_type == list else type(self.paste_data[0])
+        self.paste_data_type, is_list, _ = header
+        self.paste_data_actual_type = list if is_list else self.paste_data_type
+
+        # Only the header is needed to know what can be pasted
+        if decode:
+            self.paste_data = clipboard.decode(bytes(cdo.GetData()))
 
     def on_paste(self, _, use_existing=False):
         # Get Selected
@@ -164,143 +296,105 @@ class ListPanel(wx.Panel):
                     dlg.ShowModal()
             return
 
-        # Increase length to match selected
-        if selected_length < paste_length:
+        with color_db.journal.group('Paste'):
+            self.paste_items(selected, selected_data, selected_length, paste_length)
+
+    def paste_items(self, selected, selected_data, selected_length, paste_length):
+        # Targets are kept as paths, as pasting rebuilds the children of their top level entry
+        paths = [self.get_path(item) for item in selected]
+
+        with color_db.document.batch():
+            # Paste over the following siblings, and add whatever is still missing at the end of their list
+            missing = paste_length - selected_length if self.paste_data_actual_type != list else 0
             item = selected[-1]
-            parent = self.entry_list.GetItemParent(item)
-            for n in range(paste_length - selected_length):
+            while missing > 0:
                 item = self.entry_list.GetNextSibling(item)
                 if not item.IsOk():
-                    if self.paste_data_type == Part:
-                        with wx.MessageDialog(self, f'Not enough entries to paste over. Expected {paste_length} parts') as dlg:
-                            dlg.ShowModal()
-                            return
-                    add_func = getattr(self, f"add_{self.paste_data_type.get_func_name()}")
-                    items, item_datas = add_func(None, entry=parent)
-                    item = items[0]
-                    item_data = item_datas[0]
+                    break
+                paths.append(self.get_path(item))
+                missing -= 1
+            if missing > 0:
+                if self.paste_data_type == Part:
+                    with wx.MessageDialog(self, f'Not enough entries to paste over. Expected {paste_length} parts') as dlg:
+                        dlg.ShowModal()
+                    return
+                paths.extend(self.add_paste_targets(paths[-1][:-1], missing))
+
+            for path, paste in zip(paths, self.paste_data):
+                if self.paste_data_actual_type == list:
+                    color_db.document.paste(path[:-1], paste, path[-1])
                 else:
-                    item_data = self.entry_list.GetItemData(item)
-                self.entry_list.SelectItem(item)
-                selected.append(item)
-                selected_data.append(item_data)
-
-        # Add to BCS first
-        for item, paste in zip(selected, self.paste_data):
-            data = self.entry_list.GetItemData(item)
-            text = self.entry_list.GetItemText(item)
-            part = None
-            if self.paste_data_actual_type == list:
-                parent = self.entry_list.GetItemParent(item)
-                part = self.entry_list.GetItemData(parent)
-                func_name = f'paste_{self.paste_data_type.get_func_name()}'
-                if not func_name.endswith('s'):
-                    func_name += 's'
-                getattr(part, func_name)(paste, False)
-            else:
-                data.paste(paste)
-
-            # Delete children and add new ones
-            self.entry_list.DeleteChildren(item)
-            if self.paste_data_type == PartSet:
-                pub.sendMessage('load_parts', root=item, part_set=data, single=True)
-            elif self.paste_data_type == Part:
-                pub.sendMessage('load_color_selectors', root=item, part=data, single=True)
-                pub.sendMessage('load_physics', root=item, part=data)
-            elif self.paste_data_actual_type == list and self.paste_data_type == ColorSelector:
-                pub.sendMessage('load_color_selectors', root=None, part=part, color_selector_entry=item, single=True)
-            elif self.paste_data_actual_type == list and self.paste_data_type == Physics:
-                pub.sendMessage('load_physics', root=None, part=part, physics_entry=item)
-            elif self.paste_data_type == PartColor:
-                color_set = []
-                index = int(text.split(':')[0])
-                pub.sendMessage('load_colors', root=item, part_color=data, color_set=color_set)
-                color_db[index] = color_set
-            elif self.paste_data_type == Body:
-                pub.sendMessage('load_bone_scales', root=item, body=data)
-            elif self.paste_data_type == Skeleton:
-                pub.sendMessage('load_bones', root=item, skeleton=data)
-
-        # Reindex
+                    color_db.document.paste(path, paste)
+
+        self.select_items([item for item in map(self.entry_list.get_item, paths) if item is not None])
         self.on_select(None)
-        pub.sendMessage(self.reindex_name)
+        pub.sendMessage('set_status_bar', text="Pasted successfully")
+
+    def add_paste_targets(self, container_path, count):
+        # New entries are only placeholders, the pasted data is written over them right after
+        if len(container_path) == 1:
+            owner = color_db.bcs
+        else:
+            owner = resolve(color_db.bcs, container_path[:-1])
+        field = container_path[-1]
+        index = len(getattr(owner, field))
+        entries = [self.new_entry(self.paste_data_type, owner) for _ in range(count)]
+        if len(container_path) == 1:
+            color_db.document.insert(field, index, entries)
+        else:
+            color_db.document.insert_children(container_path[:-1], field, index, entries)
+        return [container_path + (i,) for i in range(index, index + count)]
+
+    @staticmethod
+    def new_entry(item_type, parent):
+        new_type = item_type()
+        if isinstance(new_type, Physics):
+            new_type.name = parent.name
+        elif isinstance(new_type, ColorSelector):
+            for i, part_color in enumerate(color_db):
+                if part_color:
+                    new_type.part_colors = i
+                    break
+        return new_type
 
     def on_delete(self, _):
         items_to_delete = self.get_selected_root_nodes()
         if not items_to_delete:
             return
 
-        for item in reversed(items_to_delete):
-            data = self.entry_list.GetItemData(item)
-            text = self.entry_list.GetItemText(item)
-            parent = self.entry_list.GetItemParent(item)
-            parent_data = self.entry_list.GetItemData(parent)
-            index = -1
-            conflicts = []
-            # Get Index
-            if not isinstance(data, list):
-                index = int(text.split(':')[0])
-
-            # Delete from BCS
-            if isinstance(data, list) and isinstance(data[0], Physics):
-                parent_data.physics.clear()
-            elif isinstance(data, list) and isinstance(data[0], ColorSelector):
-                parent_data.color_selectors.clear()
-            elif isinstance(data, PartSet):
-                color_db.bcs.part_sets.pop(index)
-            elif isinstance(data, Part):
-                name = text.split(':')[1].strip().replace(' ', '_').lower()
-                parent_data.parts.pop(name)
-            elif isinstance(data, ColorSelector):
-                part_set_item = self.entry_list.GetItemParent(parent)
-                part_set = self.entry_list.GetItemData(part_set_item)
-                part_set.color_selectors.pop(index)
-            elif isinstance(data, Physics):
-                part_set_item = self.entry_list.GetItemParent(parent)
-                part_set = self.entry_list.GetItemData(part_set_item)
-                part_set.physics.pop(index)
-            elif isinstance(data, PartColor):
-                conflicts = self.check_color_conflicts(index)
-                if conflicts:
-                    msg = "\n".join([f"* Part Set {c[0]}, {c[1]}" for c in conflicts])
-                    with MultiMessageDialog(self, f"Cannot delete Part Color {index}."
-                                            "The following parts are still using it:",
-                                            "Warning", msg, wx.OK) as dlg:
-                        dlg.ShowModal()
-                else:
-                    color_db.bcs.part_colors.pop(index)
-                    color_db.pop(index)
-                    self.adjust_colors(index, delete=True)
-            elif isinstance(data, Color):
-                parent_text = self.entry_list.GetItemText(parent)
-                parent_index = int(parent_text.split(':')[0])
-                conflicts = self.check_color_conflicts(parent_index, index)
-                if conflicts:
-                    msg = "\n".join([f"* Part Set {c[0]}, {c[1]}" for c in conflicts])
-                    with MultiMessageDialog(self, f"Cannot delete Part Color {parent_index}, Color {index}."
-                                            "The following parts are still using it:",
-                                            "Warning", msg, wx.OK) as dlg:
-                        dlg.ShowModal()
+        with color_db.journal.group('Delete'):
+            self.delete_items(items_to_delete)
+
+    def delete_items(self, items_to_delete):
+        paths = []
+        with color_db.document.batch():
+            for item in items_to_delete:
+                path = self.get_path(item)
+                if isinstance(self.entry_list.GetItemData(item), list):
+                    color_db.document.clear_field(path[:-1], path[-1])
                 else:
-                    parent_data.colors.pop(index)
-                    color_db[parent_index].pop(index)
-                    self.adjust_colors(parent_index, index, delete=True)
-            elif isinstance(data, Body):
-                color_db.bcs.bodies.pop(index)
-            elif isinstance(data, BoneScale):
-                parent_data.bone_scales.pop(index)
-            elif isinstance(data, Skeleton):
-                color_db.bcs.skeletons.pop(index)
-            elif isinstance(data, Bone):
-                parent_data.bones.pop(index)
-
-            # Finally Delete from Tree
-            if not conflicts:
-                self.entry_list.Delete(item)
-
-        pub.sendMessage(self.reindex_name)
+                    paths.append(path)
+            # Part Colors and Colors are only removed if nothing uses them
+            conflicts = color_db.document.remove(paths)
+
+        for path, used_by in conflicts:
+            if len(path) == 2:
+                label = f"Part Color {path[1]}"
+            else:
+                label = f"Part Color {path[1]}, Color {path[3]}"
+            msg = "\n".join([f"* Part Set {c[0]}, {c[1]}" for c in used_by])
+            with MultiMessageDialog(self, f"Cannot delete {label}."
+                                    "The following parts are still using it:",
+                                    "Warning", msg, wx.OK) as dlg:
+                dlg.ShowModal()
         pub.sendMessage('set_status_bar', text="Deleted successfully")
 
+    def get_path(self, item):
+        return self.entry_list.get_path(item)
+
+    def get_index(self, item):
+        return self.entry_list.get_path(item)[-1]
+
     def expand_parents(self, item):
         root = self.entry_list.GetRootItem()
         parent = self.entry_list.GetItemParent(item)
@@ -308,47 +402,28 @@ class ListPanel(wx.Panel):
             self.entry_list.Expand(parent)
             parent = self.entry_list.GetItemParent(parent)
 
+    def get_root_node(self, item):
+        return self.entry_list.get_top_item(item)
+
     def get_selected_root_nodes(self):
         selected = self.entry_list.GetSelections()
         if not selected:
             return []
         root = self.entry_list.GetRootItem()
+        selected_set = set(selected)
 
+        # Nodes are at most three levels deep, so checking the ancestors is cheap
         nodes = []
         for item in selected:
             parent = self.entry_list.GetItemParent(item)
             while parent != root and parent.IsOk():
-                if parent in selected:
+                if parent in selected_set:
                     break
                 parent = self.entry_list.GetItemParent(parent)
             if parent == root:
                 nodes.append(item)
         return nodes
 
-    def check_color_conflicts(self, part_color_index, color_index=-1):
-        conflicts = []
-        for ps_idx, part_set in enumerate(color_db.bcs.part_sets):
-            for part_name, part in part_set.parts.items():
-                for cs_idx, color_selector in enumerate(part.color_selectors):
-                    if color_selector.part_colors == part_color_index and \
-                            (color_index == -1 or color_selector.color == color_index):
-                        conflicts.append((ps_idx, part_name))
-        return conflicts
-
-    def adjust_colors(self, part_color_index, color_index=-1, delete=False):
-        modifier = -1 if delete else 1
-        for ps_idx, part_set in enumerate(color_db.bcs.part_sets):
-            for part_name, part in part_set.parts.items():
-                for cs_idx, color_selector in enumerate(part.color_selectors):
-                    # Shift just part colors
-                    if color_index == -1:
-                        if color_selector.part_colors >= part_color_index:
-                            color_selector.part_colors += modifier
-                    # Shift colors
-                    else:
-                        if color_selector.part_colors == part_color_index and color_selector.color >= color_index:
-                            color_selector.color += modifier
-
     def select_items(self, items):
         self.entry_list.UnselectAll()
         if not items:
@@ -381,12 +456,11 @@ class ListPanel(wx.Panel):
         if not add_at_end:
             if not entry:
                 entry = self.entry_list.GetSelections()[0]
-            text = self.entry_list.GetItemText(entry)
             data = self.entry_list.GetItemData(entry)
             parent = self.entry_list.GetRootItem()
             if not isinstance(data, item_type):
                 return
-            index = int(text.split(':')[0])
+            index = self.get_index(entry)
             if append:
                 index += 1
         else:
@@ -397,32 +471,18 @@ class ListPanel(wx.Panel):
         if paste:
             num_entries = len(self.paste_data)
 
-        new_items = []
-        new_types = []
-        for n in range(num_entries):
-            # Add Part Set
-            new_type = item_type()
-            getattr(color_db.bcs, name).insert(index, new_type)
-            new_types.append(new_type)
-
-            # Insert into Treelist
-            new_items.append(self.entry_list.InsertItem(parent, index, "", data=new_type))
-
-            # Part Colors only
-            if isinstance(new_type, PartColor):
-                color_db.insert(index, [])
-                self.adjust_colors(index)
+        with color_db.journal.group(f'Add {label}'):
+            new_types = [item_type() for _ in range(num_entries)]
+            color_db.document.insert(name, index, new_types)
+            new_items = get_children(self.entry_list, parent)[index:index + num_entries]
+            self.select_items(new_items)
 
-        self.select_items(new_items)
+            if not skip_reindex:
+                pub.sendMessage("set_status_bar", text=f"Added {label} successfully")
 
-        # Reindex
-        if not skip_reindex:
-            pub.sendMessage(self.reindex_name)
-            pub.sendMessage("set_status_bar", text=f"Added {label} successfully")
-
-        if paste:
-            self.on_paste(None, use_existing=True)
-        return new_items, new_types
+            if paste:
+                self.on_paste(None, use_existing=True)
+            return new_items, new_types
 
     def add_part(self, _, part_name, entry=None):
         if not entry:
@@ -439,6 +499,7 @@ class ListPanel(wx.Panel):
             part_set_item = self.entry_list.GetItemParent(entry)
 
         part_set = self.entry_list.GetItemData(part_set_item)
+        pub.sendMessage('populate_part_set', item=part_set_item)
         new_name = color_db.name
         part_item, cookie = self.entry_list.GetFirstChild(part_set_item)
         if part_item.IsOk():
@@ -451,24 +512,12 @@ class ListPanel(wx.Panel):
         # Add new part
         new_part = Part()
         new_part.name = new_name
-        part_set.parts[part_name] = new_part
-
-        # Insert into Tree List
-        index = BCS_PART_LIST.index(part_name)
-        name = part_name.replace('_', ' ').capitalize()
-        tree_index = 0
-        while part_item.IsOk():
-            text = self.entry_list.GetItemText(part_item)
-            next_index = int(text.split(':')[0])
-            if index < next_index:
-                break
-            part_item, cookie = self.entry_list.GetNextChild(part_set_item, cookie)
-            tree_index += 1
-        new_item = self.entry_list.InsertItem(part_set_item, tree_index, f"{index}: {name}", data=new_part)
+        with color_db.journal.group('Add Part'):
+            color_db.document.add_part(self.get_path(part_set_item), part_name, new_part)
+        # The first part of an empty part set comes back unloaded
+        pub.sendMessage('populate_part_set', item=part_set_item)
+        new_item = self.entry_list.get_item(self.get_path(part_set_item) + ('parts', part_name))
         self.select_items([new_item])
-
-        # Reindex
-        pub.sendMessage("reindex_part_sets")
         return new_item, new_part
 
     def add_color(self, _, append=True, entry=None, skip_reindex=False, paste=False):
@@ -483,28 +532,25 @@ class ListPanel(wx.Panel):
     def add_sub_items(self, append, entry, parent_type, item_type, skip_reindex, paste):
         name = f'{item_type.get_func_name()}s'
         label = f'{item_type.get_func_name()}'
+        if paste:
+            self.get_paste_data()
+        if paste and not item_type == self.paste_data_type:
+            return
         if not entry:
             entry = self.entry_list.GetSelections()[0]
-        text = self.entry_list.GetItemText(entry)
         data = self.entry_list.GetItemData(entry)
         if not isinstance(data, item_type) and not isinstance(data, parent_type):
             return
 
         if isinstance(data, item_type) and append:
             parent = self.entry_list.GetItemParent(entry)
-            parent_data = self.entry_list.GetItemData(parent)
-            attr_list = getattr(parent_data, name)
-            index = int(text.split(':')[0]) + 1
+            index = self.get_index(entry) + 1
         elif isinstance(data, item_type) and not append:
             parent = self.entry_list.GetItemParent(entry)
-            parent_data = self.entry_list.GetItemData(parent)
-            attr_list = getattr(parent_data, name)
-            index = int(text.split(':')[0])
+            index = self.get_index(entry)
         elif isinstance(data, parent_type):
             parent = entry
-            parent_data = self.entry_list.GetItemData(parent)
-            attr_list = getattr(parent_data, name)
-            index = len(attr_list)
+            index = len(getattr(data, name))
         else:
             return
 
@@ -512,38 +558,19 @@ class ListPanel(wx.Panel):
         if paste:
             num_entries = len(self.paste_data)
 
-        new_items = []
-        new_types = []
-        for n in range(num_entries):
-            # Add new type
-            new_type = item_type()
-            attr_list.insert(index, new_type)
-            new_types.append(new_type)
-
-            # Insert into Treelist
-            new_item = self.entry_list.InsertItem(parent, index, "", data=new_type)
-
-            # Colors only
-            if isinstance(new_type, Color):
-                bitmap = wx.Bitmap.FromRGBA(16, 16, 0, 0, 0, 255)
-                image = color_db.image_list.Add(bitmap)
-                parent_text = self.entry_list.GetItemText(parent)
-                parent_index = int(parent_text.split(':')[0])
-                color_db[parent_index].insert(index, image)
-                self.entry_list.SetItemImage(new_item, image)
-                self.adjust_colors(parent_index, index)
-            new_items.append(new_item)
-
-        self.select_items(new_items)
-
-        # Reindex
-        if not skip_reindex:
-            pub.sendMessage(self.reindex_name)
-            pub.sendMessage("set_status_bar", text=f"Added {label} successfully")
+        parent_index = self.get_index(parent)
+        with color_db.journal.group(f'Add {label}'):
+            new_types = [item_type() for _ in range(num_entries)]
+            color_db.document.insert_children((self.list_name, parent_index), name, index, new_types)
+            new_items = get_children(self.entry_list, parent)[index:index + num_entries]
+            self.select_items(new_items)
 
-        if paste:
-            self.on_paste(None, use_existing=True)
-        return new_items, new_types
+            if not skip_reindex:
+                pub.sendMessage("set_status_bar", text=f"Added {label} successfully")
+
+            if paste:
+                self.on_paste(None, use_existing=True)
+            return new_items, new_types
 
     def add_color_selector(self, _, append=True, entry=None, skip_reindex=False, paste=False):
         return self.add_parts_item(append, entry, ColorSelector, skip_reindex, paste)
@@ -552,6 +579,10 @@ class ListPanel(wx.Panel):
         return self.add_parts_item(append, entry, Physics, skip_reindex, paste)
 
     def add_parts_item(self, append, entry, item_type, skip_reindex, paste):
+        if paste:
+            self.get_paste_data()
+        if paste and not item_type == self.paste_data_type:
+            return
         if paste and self.paste_data_actual_type == list and len(self.paste_data) > 1:
             with wx.MessageDialog(self, f"Can only add copies of 1 {item_type} list at a time", "Error") as dlg:
                 dlg.ShowModal()
@@ -570,38 +601,16 @@ class ListPanel(wx.Panel):
         if not isinstance(data, item_type) and not isinstance(data, Part) and text != label:
             return
 
-        if isinstance(data, item_type) and append:
-            item_list = self.entry_list.GetItemParent(entry)
-            part_attr_list = self.entry_list.GetItemData(item_list)
-            index = int(text.split(':')[0]) + 1
-        elif isinstance(data, item_type) and not append:
-            item_list = self.entry_list.GetItemParent(entry)
-            part_attr_list = self.entry_list.GetItemData(item_list)
-            index = int(text.split(':')[0])
+        if isinstance(data, item_type):
+            part_item = self.entry_list.GetItemParent(self.entry_list.GetItemParent(entry))
+            index = self.get_index(entry) + (1 if append else 0)
         elif isinstance(data, Part):
-            child, cookie = self.entry_list.GetFirstChild(entry)
-            item_list = None
-            item_index = 0
-            entry_index = 0
-            while child.IsOk():
-                text = self.entry_list.GetItemText(child)
-                if text == label:
-                    item_list = child
-                    break
-                child, cookie = self.entry_list.GetNextChild(entry, cookie)
-                item_index += 1
-                if label > text:
-                    entry_index = item_index
-            if not item_list:
-                part_attr_list = getattr(data, name)
-                item_list = self.entry_list.InsertItem(entry, entry_index, label, data=part_attr_list)
-            else:
-                part_attr_list = self.entry_list.GetItemData(item_list)
-            index = len(part_attr_list)
+            part_item = entry
+            index = len(getattr(data, name))
         else:
-            item_list = entry
-            part_attr_list = self.entry_list.GetItemData(item_list)
-            index = len(part_attr_list)
+            part_item = self.entry_list.GetItemParent(entry)
+            index = len(data)
+        part = self.entry_list.GetItemData(part_item)
 
         num_entries = 1
         if paste and self.paste_data_actual_type == list:
@@ -609,37 +618,19 @@ class ListPanel(wx.Panel):
             self.paste_data_actual_type = self.paste_data_type
             num_entries = len(self.paste_data)
 
-        new_items = []
-        new_types = []
-        for n in range(num_entries):
-            # Get Part
-            part_item = self.entry_list.GetItemParent(item_list)
-            part = self.entry_list.GetItemData(part_item)
-
-            # Add Part Set
-            new_type = item_type()
-            if isinstance(new_type, Physics):
-                new_type.name = part.name
-            elif isinstance(new_type, ColorSelector):
-                for i, part_color in enumerate(color_db):
-                    if part_color:
-                        new_type.part_colors = i
-                        break
-            part_attr_list.insert(index, new_type)
-            new_types.append(new_type)
-
-            # Insert into Treelist
-            new_items.append(self.entry_list.InsertItem(item_list, index, "", data=new_type))
-
-        self.select_items(new_items)
-
-        # Reindex
-        if not skip_reindex:
-            pub.sendMessage("reindex_part_sets")
-            pub.sendMessage("set_status_bar", text=f"Added {label} successfully")
-        if paste:
-            self.on_paste(None, use_existing=True)
-        return new_items, new_types
+        with color_db.journal.group(f'Add {label}'):
+            new_types = [self.new_entry(item_type, part) for _ in range(num_entries)]
+            path = self.get_path(part_item) + (name,)
+            color_db.document.insert_children(path[:-1], name, index, new_types)
+            new_items = [self.entry_list.get_item(path + (i,)) for i in range(index, index + num_entries)]
+            new_items = [item for item in new_items if item is not None]
+            self.select_items(new_items)
+
+            if not skip_reindex:
+                pub.sendMessage("set_status_bar", text=f"Added {label} successfully")
+            if paste:
+                self.on_paste(None, use_existing=True)
+            return new_items, new_types
 
     def on_select(self, _):
         if not self.entry_list:
@@ -729,7 +720,7 @@ class ListPanel(wx.Panel):
             return
         selected_item_type, selected_actual_type = self.get_item_type_of_item_list(selections)
         menu = wx.Menu()
-        self.get_paste_data()
+        self.get_paste_data(decode=False)
         if len(selections) == 1:
             self.add_single_selection_items(menu, selections[0])
             menu.AppendSeparator()
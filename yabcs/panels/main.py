@@ -37,6 +37,7 @@ class MainPanel(wx.Panel):
         page = self.notebook.GetCurrentPage()
         page_name = self.notebook.GetPageText(self.notebook.GetSelection())
         name = page_name.replace(' ', '_').lower()
+        # Relabel anything left dirty by changes made on other pages
         pub.sendMessage(f"reindex_{name}")
 
         item_type = page_name[:-1]
@@ -26,6 +26,7 @@ class SidePanel(wx.Panel):
         self.sizer = wx.BoxSizer()
         self.root = parent
         self.panels = {}
+        self.panel_types = {}
         self.current_panel = None
 
         self.add_panel(Part)
@@ -43,17 +44,25 @@ class SidePanel(wx.Panel):
         self.SetAutoLayout(1)
 
     def add_panel(self, item_type):
-        name = item_type.__name__
-        panel_class = getattr(sys.modules[__name__], name + 'Panel')
-        panel = panel_class(self, self.root, name, item_type)
-        panel.Hide()
+        # Panels are only built the first time an entry of their type is shown
+        self.panel_types[item_type.__name__] = item_type
 
-        self.panels[name] = panel
-        self.sizer.Add(panel, 1, wx.ALL | wx.EXPAND, 10)
+    def get_panel(self, name):
+        panel = self.panels.get(name)
+        if panel is None:
+            item_type = self.panel_types[name]
+            panel_class = getattr(sys.modules[__name__], name + 'Panel')
+            panel = panel_class(self, self.root, name, item_type)
+            panel.Hide()
+
+            self.panels[name] = panel
+            self.sizer.Add(panel, 1, wx.ALL | wx.EXPAND, 10)
+        return panel
 
     def show_panel(self, panel, item, entry):
         if self.current_panel != panel:
             if self.current_panel:
+                self.current_panel.flush_edits()
                 self.current_panel.Hide()
             self.current_panel = panel
             self.current_panel.Show()
@@ -61,8 +70,13 @@ class SidePanel(wx.Panel):
             self.Layout()
         self.current_panel.load_entry(item, entry)
 
+    def flush_edits(self):
+        if self.current_panel:
+            self.current_panel.flush_edits()
+
     def hide_panels(self):
         for panel in self.panels.values():
+            panel.flush_edits()
             panel.Hide()
         pub.sendMessage('clear_focus')
         self.current_panel = None
@@ -70,7 +84,7 @@ class SidePanel(wx.Panel):
 
     def load_entry(self, item, entry):
         name = type(entry).__name__
-        if name in self.panels:
-            self.show_panel(self.panels[name], item, entry)
+        if name in self.panel_types:
+            self.show_panel(self.get_panel(name), item, entry)
         else:
             self.hide_panels()
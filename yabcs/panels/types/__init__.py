@@ -5,7 +5,7 @@ from threading import Thread
 import time
 from wx.lib.scrolledpanel import ScrolledPanel
 
-from pyxenoverse.gui import add_entry, EVT_RESULT, EditThread
+from pyxenoverse.gui import add_entry
 from pyxenoverse.gui.ctrl.colour_picker_alpha_ctrl import ColourPickerAlphaCtrl
 from pyxenoverse.gui.ctrl.hex_ctrl import HexCtrl
 from pyxenoverse.gui.ctrl.multiple_selection_box import MultipleSelectionBox
@@ -13,6 +13,12 @@ from pyxenoverse.gui.ctrl.single_selection_box import SingleSelectionBox
 from pyxenoverse.gui.ctrl.text_ctrl import TextCtrl
 from pyxenoverse.gui.ctrl.unknown_hex_ctrl import UnknownHexCtrl
 
+from yabcs.journal import FieldChange
+from yabcs.utils import color_db
+
+# Typing is saved once nothing has changed for this long, in milliseconds
+EDIT_DELAY = 500
+
 
 class Page(ScrolledPanel):
     def __init__(self, parent, rows=32):
@@ -33,7 +39,8 @@ class BasePanel(wx.Panel):
         self.root = root
         self.item = None
         self.entry = None
-        self.edit_thread = None
+        self.loading = False
+        self.edited = set()
         self.controls = {}
         self.saved_values = {}
         self.item_type = item_type
@@ -49,12 +56,15 @@ class BasePanel(wx.Panel):
         sizer.Add(self.notebook, 1, wx.ALL | wx.EXPAND, 10)
 
         self.Bind(wx.EVT_TEXT, self.on_edit)
-        self.Bind(wx.EVT_COMBOBOX, self.save_entry)
-        self.Bind(wx.EVT_CHECKBOX, self.save_entry)
-        self.Bind(wx.EVT_RADIOBOX, self.save_entry)
-        self.Bind(wx.EVT_SLIDER, self.save_entry)
-        self.Bind(wx.EVT_COLOURPICKER_CHANGED, self.save_entry)
-        EVT_RESULT(self, self.save_entry)
+        self.Bind(wx.EVT_COMBOBOX, self.on_change)
+        self.Bind(wx.EVT_CHECKBOX, self.on_change)
+        self.Bind(wx.EVT_RADIOBOX, self.on_change)
+        self.Bind(wx.EVT_SLIDER, self.on_change)
+        self.Bind(wx.EVT_COLOURPICKER_CHANGED, self.on_change)
+
+        # One timer per panel, restarted on every keystroke
+        self.edit_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_edit_timer, self.edit_timer)
 
         pub.subscribe(self.focus_on, 'focus_on')
 
@@ -105,11 +115,44 @@ class BasePanel(wx.Panel):
         control = self.add_float_entry(panel, None, *args, **kwargs)
         return label, control
 
-    def on_edit(self, _):
-        if not self.edit_thread:
-            self.edit_thread = EditThread(self)
-        else:
-            self.edit_thread.new_sig()
+    def on_edit(self, e):
+        # Values set while loading an entry are not edits
+        if self.loading or self.entry is None:
+            return
+        name = self.get_control_name(e.GetEventObject())
+        if name is None:
+            return
+        self.edited.add(name)
+        self.edit_timer.StartOnce(EDIT_DELAY)
+
+    def on_change(self, e):
+        if self.loading or self.entry is None:
+            return
+        name = self.get_control_name(e.GetEventObject())
+        if name is None:
+            return
+        # Saved right away, along with anything still being typed
+        self.edited.add(name)
+        self.flush_edits()
+
+    def on_edit_timer(self, _):
+        self.flush_edits()
+
+    def flush_edits(self):
+        self.edit_timer.Stop()
+        if not self.edited:
+            return
+        names, self.edited = self.edited, set()
+        self.save_entry(None, names)
+
+    def get_control_name(self, ctrl):
+        # Events may come from a child of one of the controls
+        while ctrl is not None and ctrl is not self:
+            for name, control in self.controls.items():
+                if control is ctrl:
+                    return name
+            ctrl = ctrl.GetParent()
+        return None
 
     def hide_entry(self, name):
         try:
@@ -135,18 +178,27 @@ class BasePanel(wx.Panel):
             control.SetValue(self.saved_values.get(name, default))
 
     def load_entry(self, item, entry):
+        # Anything still being typed belongs to the previous entry
+        self.flush_edits()
         self.item = item
         self.saved_values = {}
         self.entry = entry
-        for name, control in self.controls.items():
-            control.SetValue(getattr(entry, name))
+        self.loading = True
+        try:
+            for name, control in self.controls.items():
+                control.SetValue(getattr(entry, name))
+        finally:
+            self.loading = False
 
-    def save_entry(self, _):
-        self.edit_thread = None
+    def save_entry(self, _, names=None):
         if self.entry is None:
             return
-        changed = []
-        for name, control in self.controls.items():
+        # Field name -> (old value, new value), only for fields that really changed
+        changed = {}
+        changes = []
+        path = color_db.journal.get_path(self.entry)
+        for name in self.controls if names is None else names:
+            control = self.controls[name]
             # SpinCtrlDoubles suck
             old_value = getattr(self.entry, name)
             if isinstance(control, wx.SpinCtrlDouble):
@@ -159,9 +211,13 @@ class BasePanel(wx.Panel):
             else:
                 new_value = control.GetValue()
             if old_value != new_value:
-                changed.append(name)
+                changed[name] = old_value, new_value
+                changes.append(FieldChange(path, name, old_value, new_value))
                 setattr(self.entry, name, new_value)
         if changed:
+            if path is not None:
+                color_db.journal.record(f'Edit {self.item_type.get_readable_name()}', changes)
+            color_db.find_index.update(self.entry)
             self.reindex(changed)
 
     def focus_on(self, entry):
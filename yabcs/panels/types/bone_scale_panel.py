@@ -14,5 +14,5 @@ class BoneScalePanel(BasePanel):
 
     def reindex(self, changed):
         if 'name' in changed:
-            pub.sendMessage('reindex_bodies')
+            pub.sendMessage('reindex_bodies', item=self.item)
 
@@ -19,4 +19,4 @@ class ColorPanel(BasePanel):
 
     def reindex(self, changed):
         if 'color1' in changed or 'color4' in changed:
-            pub.sendMessage("reindex_part_colors")
+            pub.sendMessage("reindex_part_colors", item=self.item)
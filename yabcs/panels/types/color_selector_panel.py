@@ -4,6 +4,7 @@ import wx.adv
 
 from pyxenoverse.gui import add_entry
 
+from yabcs.journal import FieldChange
 from yabcs.panels.types import BasePanel
 from yabcs.utils import color_db
 
@@ -11,7 +12,10 @@ from yabcs.utils import color_db
 class ColorSelectorPanel(BasePanel):
     def __init__(self, *args):
         BasePanel.__init__(self, *args)
-        self.current_part_color = 0
+        self.current_part_color = None
+        # Choice lists are rebuilt only when color_db.version changes
+        self.version = None
+        self.color_choices = {}
 
         self.controls['part_colors'] = self.add_combo_box(self.entry_page, 'Part Colors')
         self.controls['part_colors'].Bind(wx.EVT_TEXT, self.skip_evt_text)
@@ -29,25 +33,32 @@ class ColorSelectorPanel(BasePanel):
         return wx.adv.BitmapComboBox(panel, *args, **kwargs)
 
     def load_entry(self, item, entry):
+        self.flush_edits()
         self.item = item
         self.saved_values = {}
         self.entry = entry
-        # Populate comboboxes first
-        self.controls['part_colors'].Clear()
-        self.controls['part_colors'].AppendItems(
-            [f'{i}: {part_color.name}' for i, part_color in enumerate(color_db.bcs.part_colors)])
 
+        # Part color names and swatches still waiting on a reindex would be cached stale
+        pub.sendMessage('reindex_part_colors')
+        if self.version != color_db.version:
+            self.version = color_db.version
+            self.color_choices = {}
+            self.current_part_color = None
+            self.controls['part_colors'].Set(
+                [f'{i}: {part_color.name}' for i, part_color in enumerate(color_db.bcs.part_colors)])
+
+        # Populate comboboxes first
         self.fill_color_combo_box()
 
         # Load values
         self.controls['part_colors'].SetSelection(self.entry.part_colors)
         self.controls['color'].SetSelection(self.entry.color)
 
-    def save_entry(self, _):
-        self.edit_thread = None
+    def save_entry(self, _, names=None):
         if self.entry is None:
             return
 
+        old_values = self.entry.part_colors, self.entry.color
         self.entry.part_colors = self.controls['part_colors'].GetSelection()
         self.entry.color = self.controls['color'].GetSelection()
 
@@ -56,16 +67,33 @@ class ColorSelectorPanel(BasePanel):
             if self.entry.color > len(color_db[self.current_part_color]) or self.entry.color == -1:
                 self.entry.color = 0
         self.controls['color'].SetSelection(self.entry.color)
-        self.reindex(None)
+
+        changed = {name: (old_value, self.entry[name])
+                   for name, old_value in zip(('part_colors', 'color'), old_values) if self.entry[name] != old_value}
+        if not changed:
+            return
+        path = color_db.journal.get_path(self.entry)
+        if path is not None:
+            color_db.journal.record('Edit Color Selector', [
+                FieldChange(path, name, old_value, new_value) for name, (old_value, new_value) in changed.items()])
+        color_db.refs.update(self.entry)
+        color_db.find_index.update(self.entry)
+        self.reindex(changed)
 
     def reindex(self, changed):
-        pub.sendMessage("reindex_part_sets")
+        pub.sendMessage("reindex_part_sets", item=self.item)
 
     def fill_color_combo_box(self):
+        if self.entry.part_colors == self.current_part_color:
+            return
         self.controls['color'].Clear()
         self.current_part_color = self.entry.part_colors
-        for i, image in enumerate(color_db[self.current_part_color]):
-            self.controls['color'].Append(str(i), color_db.image_list.GetBitmap(image))
+        bitmaps = self.color_choices.get(self.current_part_color)
+        if bitmaps is None:
+            bitmaps = [color_db.image_list.GetBitmap(image) for image in color_db[self.current_part_color]]
+            self.color_choices[self.current_part_color] = bitmaps
+        for i, bitmap in enumerate(bitmaps):
+            self.controls['color'].Append(str(i), bitmap)
 
     def skip_evt_text(self, _):
         pass
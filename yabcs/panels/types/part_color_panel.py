@@ -10,5 +10,6 @@ class PartColorPanel(BasePanel):
         self.controls['name'] = self.add_text_entry(self.entry_page, 'Name')
 
     def reindex(self, changed):
-        pub.sendMessage('reindex_part_colors')
+        if 'name' in changed:
+            pub.sendMessage('reindex_part_colors', item=self.item)
 
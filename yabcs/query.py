@@ -0,0 +1,42 @@
+import re
+
+RANGE_PATTERN = re.compile(r'^\s*(\S+?)\s*[-–]\s*(\S+)\s*$')
+MASK_PATTERN = re.compile(r'^\s*&\s*(\S+)\s*$')
+
+
+class Query:
+    def __init__(self, text, numeric=False, regex=False):
+        self.text = text
+        self.numeric = numeric
+        self.regex = regex
+        self.key = (text, numeric, regex)
+        self.exact = None
+        self.pattern = None
+
+        if numeric:
+            self.match = self.parse_number(text)
+        elif regex:
+            try:
+                self.pattern = re.compile(text, re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(str(e))
+            self.match = lambda value: self.pattern.search(value) is not None
+        else:
+            lower = text.lower()
+            self.match = lambda value: lower in value.lower()
+
+    def parse_number(self, text):
+        # "& 0x4" matches values with all of those bits set
+        match = MASK_PATTERN.match(text)
+        if match:
+            mask = int(match.group(1), 0)
+            return lambda value: value & mask == mask
+
+        # "100-200" matches an inclusive range
+        match = RANGE_PATTERN.match(text)
+        if match:
+            low, high = sorted((int(match.group(1), 0), int(match.group(2), 0)))
+            return lambda value: low <= value <= high
+
+        self.exact = int(text, 0)
+        return lambda value: value == self.exact
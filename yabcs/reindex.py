@@ -0,0 +1,35 @@
+def get_children(tree, item):
+    children = []
+    child, cookie = tree.GetFirstChild(item)
+    while child.IsOk():
+        children.append(child)
+        child, cookie = tree.GetNextChild(item, cookie)
+    return children
+
+
+class DirtyRange:
+    def __init__(self):
+        self.start = None
+        self.items = {}
+        self.full = False
+
+    def __bool__(self):
+        return self.full or self.start is not None or bool(self.items)
+
+    def mark(self, start=None, item=None, full=False):
+        if full:
+            self.full = True
+        # Top level entries from start onwards need their index relabeled
+        if start is not None and (self.start is None or start < self.start):
+            self.start = start
+        # Only the children of item need to be relabeled, kept in order without duplicates
+        if item is not None:
+            self.items[item] = None
+
+    def discard(self, item):
+        self.items.pop(item, None)
+
+    def clear(self):
+        self.start = None
+        self.items = {}
+        self.full = False
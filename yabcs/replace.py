@@ -0,0 +1,71 @@
+import re
+
+from pyxenoverse.bcs.color_selector import ColorSelector
+
+from yabcs.utils import color_db
+
+
+def is_valid_color(part_colors, color, color_sets=color_db):
+    return 0 <= part_colors < len(color_sets) and 0 <= color < len(color_sets[part_colors])
+
+
+class Change:
+    def __init__(self, record, field, old, new):
+        self.record = record
+        self.field = field
+        self.old = old
+        self.new = new
+
+
+class ChangeSet:
+    def __init__(self):
+        self.changes = []
+        self.skipped = []
+
+    def __len__(self):
+        return len(self.changes)
+
+    def apply(self, label='Replace All'):
+        color_db.document.set_fields(label, [(change.record, change.field, change.new) for change in self.changes])
+
+
+def get_replacement(query, value, replace):
+    if query.numeric:
+        return replace
+    if query.regex:
+        try:
+            return query.pattern.sub(replace, value)
+        except re.error as e:
+            raise ValueError(str(e))
+    # Text queries match regardless of case, so replace the same way
+    return re.sub(re.escape(query.text), lambda _: replace, value, flags=re.IGNORECASE)
+
+
+def plan_replace(item_type, entry_type, query, replace, find_index=None, color_sets=color_db):
+    if find_index is None:
+        find_index = color_db.find_index
+    _, records = find_index.search(item_type, entry_type, query)
+    return plan_changes(records, item_type, entry_type, query, replace, color_sets)
+
+
+def plan_changes(records, item_type, entry_type, query, replace, color_sets=color_db):
+    # records have to match the query already
+    change_set = ChangeSet()
+    for record in records:
+        old = record[entry_type]
+        new = get_replacement(query, old, replace)
+        if new == old:
+            continue
+        if item_type == ColorSelector:
+            # Color selectors with invalid part colors are not shown, so leave them alone
+            if not is_valid_color(record.part_colors, record.color, color_sets):
+                continue
+            if entry_type == "part_colors":
+                valid = is_valid_color(new, record.color, color_sets)
+            else:
+                valid = is_valid_color(record.part_colors, new, color_sets)
+            if not valid:
+                change_set.skipped.append(Change(record, entry_type, old, new))
+                continue
+        change_set.changes.append(Change(record, entry_type, old, new))
+    return change_set
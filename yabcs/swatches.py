@@ -0,0 +1,67 @@
+import wx
+
+
+def get_swatch_color(part_color, color):
+    # Hack, as eye_ uses Color4
+    if part_color.name == 'eye_':
+        return tuple(color.color4[:3])
+    return tuple(color.color1[:3])
+
+
+class SwatchCache:
+    def __init__(self, image_list):
+        self.image_list = image_list
+        self.images = {}
+        self.colors = {}
+        self.counts = {}
+        self.free = []
+
+    def clear(self):
+        self.image_list.RemoveAll()
+        self.images = {}
+        self.colors = {}
+        self.counts = {}
+        self.free = []
+
+    def acquire(self, color):
+        image = self.images.get(color)
+        if image is None:
+            bitmap = wx.Bitmap.FromRGBA(16, 16, *color, 255)
+            if self.free:
+                image = self.free.pop()
+                self.image_list.Replace(image, bitmap)
+            else:
+                image = self.image_list.Add(bitmap)
+            self.images[color] = image
+            self.colors[image] = color
+            self.counts[image] = 0
+        self.counts[image] += 1
+        return image
+
+    def release(self, image):
+        count = self.counts.get(image)
+        if count is None:
+            return
+        if count > 1:
+            self.counts[image] = count - 1
+            return
+        # Keep the slot around to be reused by the next new color
+        del self.counts[image]
+        del self.images[self.colors.pop(image)]
+        self.free.append(image)
+
+    def update(self, image, color):
+        if self.colors.get(image) == color:
+            return image
+
+        # Redraw in place if no other color shares this swatch
+        if self.counts.get(image) == 1 and color not in self.images:
+            self.image_list.Replace(image, wx.Bitmap.FromRGBA(16, 16, *color, 255))
+            del self.images[self.colors[image]]
+            self.images[color] = image
+            self.colors[image] = color
+            return image
+
+        new_image = self.acquire(color)
+        self.release(image)
+        return new_image
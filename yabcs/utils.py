@@ -2,17 +2,34 @@ from pyxenoverse.bcs.part import Part
 from pyxenoverse.bcs.color_selector import ColorSelector
 from pyxenoverse.bcs.physics import Physics
 
+from yabcs.color_refs import ColorSelectorRefs
+from yabcs.find_index import FindIndex
+from yabcs.journal import Journal
+
 FIND_ITEM_TYPES = [
     (Part, ['name', "model", "model2", "texture", "emd_name", "emm_name", "emb_name", "ean_name", "dyt_options", "part_hiding"]),
     (Physics, ['name', "texture", "emd_name", "emm_name", "emb_name", "esk_name", "bone_name", "scd_name", "dyt_options", "part_hiding"]),
     (ColorSelector, ['part_colors', 'color']),
 ]
 
+# Child of a Part Set tree node whose parts have not been loaded yet
+PLACEHOLDER = object()
+
 
 class ColorDb(list):
     name = ''
     bcs = None
     image_list = None
+    refs = None
+    swatches = None
+    find_index = None
+    journal = None
+    document = None
+    # Bumped whenever part colors or their swatches change
+    version = 0
 
 
 color_db = ColorDb()
+color_db.refs = ColorSelectorRefs()
+color_db.find_index = FindIndex(FIND_ITEM_TYPES)
+color_db.journal = Journal(color_db.find_index)